@@ -0,0 +1,281 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+from PIL import Image
+
+DEFAULT_MEMORY_ITEMS = 128
+DEFAULT_CACHE_DIR = ".ecosmart_cache"
+DEFAULT_MAX_DISK_MB = 200
+# Largest number of differing dHash bits still treated as the same photo
+DEFAULT_MAX_HASH_DISTANCE = 4
+DEFAULT_SUGGESTION_TTL_DAYS = 30
+
+_cache = None
+_cache_lock = threading.Lock()
+_suggestion_cache = None
+
+
+def content_key(image_bytes):
+    """Returns the SHA-256 of the image bytes, the exact-match cache key."""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def perceptual_hash(image_bytes):
+    """
+    Returns the 64-bit difference hash (dHash) of an image. Re-encoded or resized copies of a
+    photo hash to the same or a nearby value, unlike the SHA-256 of the bytes.
+    """
+    image = Image.open(BytesIO(image_bytes)).convert("L").resize((9, 8), Image.LANCZOS)
+    pixels = list(image.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left, right = pixels[row * 9 + col], pixels[row * 9 + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+class AnalysisCache:
+    """
+    Two-tier cache of EcoSmart analysis results keyed by the SHA-256 of the image bytes:
+    an in-memory LRU of memory_items entries in front of a directory of JSON files that is
+    trimmed, least recently used first, to max_disk_bytes. With use_perceptual, a miss on the
+    exact key falls back to the closest stored dHash within max_hash_distance bits.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, memory_items=DEFAULT_MEMORY_ITEMS,
+                 max_disk_bytes=DEFAULT_MAX_DISK_MB * 1024 * 1024, use_perceptual=False,
+                 max_hash_distance=DEFAULT_MAX_HASH_DISTANCE):
+        self.cache_dir = cache_dir
+        self.memory_items = memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self.use_perceptual = use_perceptual
+        self.max_hash_distance = max_hash_distance
+        self._memory = OrderedDict()
+        self._perceptual_index = None
+        self._lock = threading.Lock()
+
+    def get(self, image_bytes):
+        """Returns the cached result for the image, or None."""
+        key = content_key(image_bytes)
+        with self._lock:
+            result = self._get_by_key(key)
+            if result is None and self.use_perceptual:
+                similar_key = self._find_similar(perceptual_hash(image_bytes))
+                if similar_key is not None:
+                    result = self._get_by_key(similar_key)
+            return result
+
+    def put(self, image_bytes, result):
+        """Stores a JSON-serializable result for the image in both tiers."""
+        key = content_key(image_bytes)
+        entry = {"result": result}
+        if self.use_perceptual:
+            entry["phash"] = perceptual_hash(image_bytes)
+        with self._lock:
+            self._remember(key, result)
+            self._write_entry(key, entry)
+            if self.use_perceptual:
+                self._load_perceptual_index()[key] = entry["phash"]
+            self._evict_disk()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _remember(self, key, result):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _get_by_key(self, key):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+
+        entry = self._read_entry(key)
+        if entry is None:
+            return None
+        # Touch the file so disk eviction sees it as recently used
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+        self._remember(key, entry["result"])
+        return entry["result"]
+
+    def _read_entry(self, key):
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_entry(self, key, entry):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Write to a temporary file first so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self._path(key))
+
+    def _evict_disk(self):
+        try:
+            names = [name for name in os.listdir(self.cache_dir) if name.endswith(".json")]
+        except FileNotFoundError:
+            return
+        entries = []
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            total -= size
+            if self._perceptual_index is not None:
+                self._perceptual_index.pop(name[:-len(".json")], None)
+
+    def _load_perceptual_index(self):
+        """Builds the key -> dHash index from the disk tier on first use."""
+        if self._perceptual_index is None:
+            self._perceptual_index = {}
+            try:
+                names = os.listdir(self.cache_dir)
+            except FileNotFoundError:
+                names = []
+            for name in names:
+                if not name.endswith(".json"):
+                    continue
+                key = name[:-len(".json")]
+                entry = self._read_entry(key)
+                if entry is not None and "phash" in entry:
+                    self._perceptual_index[key] = entry["phash"]
+        return self._perceptual_index
+
+    def _find_similar(self, phash):
+        best_key, best_distance = None, self.max_hash_distance + 1
+        for key, other in self._load_perceptual_index().items():
+            distance = bin(phash ^ other).count("1")
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        return best_key
+
+
+def get_analysis_cache():
+    """
+    Returns the process-wide analysis cache. ANALYSIS_CACHE_DIR, ANALYSIS_CACHE_MAX_MB and
+    ANALYSIS_CACHE_MEMORY_ITEMS size it; ANALYSIS_CACHE_PERCEPTUAL=1 enables near-duplicate matching.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnalysisCache(
+                    cache_dir=os.environ.get("ANALYSIS_CACHE_DIR", DEFAULT_CACHE_DIR),
+                    memory_items=int(os.environ.get("ANALYSIS_CACHE_MEMORY_ITEMS", DEFAULT_MEMORY_ITEMS)),
+                    max_disk_bytes=int(float(os.environ.get("ANALYSIS_CACHE_MAX_MB", DEFAULT_MAX_DISK_MB)) * 1024 * 1024),
+                    use_perceptual=os.environ.get("ANALYSIS_CACHE_PERCEPTUAL", "0").lower() in ("1", "true", "yes"),
+                )
+    return _cache
+
+
+class SuggestionCache:
+    """
+    Per-object cache of 5R suggestions, held in memory and as one JSON file per object.
+    Entries written under another prompt_version, or older than ttl_seconds, count as misses.
+    """
+
+    def __init__(self, cache_dir, prompt_version, ttl_seconds=DEFAULT_SUGGESTION_TTL_DAYS * 86400):
+        self.cache_dir = cache_dir
+        self.prompt_version = prompt_version
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._memory = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, object_names):
+        """Returns {object name: suggestions} for the names with a current entry."""
+        found = {}
+        with self._lock:
+            for name in object_names:
+                entry = self._memory.get(name.lower()) or self._read_entry(name)
+                if entry is not None and self._is_current(entry):
+                    self._memory[name.lower()] = entry
+                    found[name] = entry["suggestions"]
+                    self.hits += 1
+                else:
+                    self.misses += 1
+        return found
+
+    def put_many(self, suggestions_by_object):
+        """Stores freshly generated suggestions, one entry per object."""
+        with self._lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for name, suggestions in suggestions_by_object.items():
+                entry = {
+                    "object": name,
+                    "prompt_version": self.prompt_version,
+                    "created_at": time.time(),
+                    "suggestions": suggestions,
+                }
+                self._memory[name.lower()] = entry
+                fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(entry, f)
+                os.replace(tmp_path, self._path(name))
+
+    def stats(self):
+        """Returns the hit and miss counts since the process started."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, hashlib.sha256(name.lower().encode("utf-8")).hexdigest() + ".json")
+
+    def _read_entry(self, name):
+        try:
+            with open(self._path(name), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _is_current(self, entry):
+        return (entry.get("prompt_version") == self.prompt_version
+                and time.time() - entry.get("created_at", 0) < self.ttl_seconds)
+
+
+def get_suggestion_cache(prompt_version):
+    """
+    Returns the process-wide suggestion cache, stored under ANALYSIS_CACHE_DIR/suggestions.
+    SUGGESTION_CACHE_TTL_DAYS sets how long entries stay valid.
+    """
+    global _suggestion_cache
+    if _suggestion_cache is None or _suggestion_cache.prompt_version != prompt_version:
+        with _cache_lock:
+            if _suggestion_cache is None or _suggestion_cache.prompt_version != prompt_version:
+                _suggestion_cache = SuggestionCache(
+                    os.path.join(os.environ.get("ANALYSIS_CACHE_DIR", DEFAULT_CACHE_DIR), "suggestions"),
+                    prompt_version,
+                    ttl_seconds=float(os.environ.get("SUGGESTION_CACHE_TTL_DAYS", DEFAULT_SUGGESTION_TTL_DAYS)) * 86400,
+                )
+    return _suggestion_cache
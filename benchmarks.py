@@ -0,0 +1,425 @@
+# Load and consistency benchmarks for the database hot paths.
+# They create their own documents (prefixed with BENCH_PREFIX) and remove them afterwards,
+# but still write to the configured database, so point MONGODB_URI at a scratch database.
+import argparse
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_PREFIX = "bench-"
+
+
+def _print_timing(label, operations, elapsed):
+    print(f"{label}: {operations} operations in {elapsed:.2f}s ({operations / elapsed:.0f} ops/s)")
+
+
+def bench_concurrent_votes(total_votes=5000, voters=500, cities=5, workers=32, seed=42):
+    """
+    Fires votes from many voters at a few cities through a thread pool, then checks that
+    every city's vote counter equals the number of voter_records pointing at it.
+    """
+    from database2 import connect_to_mongodb, record_vote, flush_counter_buffer
+
+    db = connect_to_mongodb()
+    if db is None:
+        raise SystemExit("Database connection error")
+
+    city_names = [f"{BENCH_PREFIX}city-{i}" for i in range(cities)]
+    db["cities"].insert_many([
+        {"name": name, "waste_index": 50, "votes": 0, "registrations": 0} for name in city_names
+    ])
+    rng = random.Random(seed)
+    jobs = [(rng.choice(city_names), f"{BENCH_PREFIX}voter-{rng.randrange(voters)}") for _ in range(total_votes)]
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda job: record_vote(*job), jobs))
+        elapsed = time.perf_counter() - start
+        _print_timing(f"record_vote with {workers} threads", total_votes, elapsed)
+        # With WRITE_BEHIND_COUNTERS=1 the city counters lag until the buffer flushes
+        flush_counter_buffer()
+
+        errors = [message for success, message in results if not success and "already voted" not in message]
+        counters = {city["name"]: city["votes"] for city in db["cities"].find({"name": {"$in": city_names}})}
+        ground_truth = {item["_id"]: item["count"] for item in db["voter_records"].aggregate([
+            {"$match": {"city": {"$in": city_names}}},
+            {"$group": {"_id": "$city", "count": {"$sum": 1}}}
+        ])}
+        mismatches = {
+            name: (counters.get(name, 0), ground_truth.get(name, 0))
+            for name in city_names if counters.get(name, 0) != ground_truth.get(name, 0)
+        }
+
+        print(f"Distinct voters: {sum(ground_truth.values())}, errors: {len(errors)}")
+        if mismatches:
+            print(f"FAILED: counter != voter_records for {mismatches}")
+        else:
+            print("OK: every city counter matches voter_records")
+        return not mismatches and not errors
+    finally:
+        db["cities"].delete_many({"name": {"$in": city_names}})
+        db["voter_records"].delete_many({"user_id": {"$regex": f"^{BENCH_PREFIX}"}})
+
+
+def bench_concurrent_upvotes(total_clicks=5000, users=500, reports=5, workers=32, seed=42):
+    """
+    Fires upvote clicks, including repeated clicks by the same user, through a thread pool and
+    checks that every report's counter equals its number of distinct upvoters.
+    """
+    from database2 import connect_to_mongodb, upvote_report
+
+    db = connect_to_mongodb()
+    if db is None:
+        raise SystemExit("Database connection error")
+
+    result = db["waste_reports"].insert_many([
+        {"title": f"{BENCH_PREFIX}report-{i}", "city": f"{BENCH_PREFIX}city", "upvotes": 0}
+        for i in range(reports)
+    ])
+    report_ids = [str(report_id) for report_id in result.inserted_ids]
+    rng = random.Random(seed)
+    jobs = [(rng.choice(report_ids), f"{BENCH_PREFIX}user-{rng.randrange(users)}") for _ in range(total_clicks)]
+    expected = {report_id: len({user for target, user in jobs if target == report_id}) for report_id in report_ids}
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda job: upvote_report(*job), jobs))
+        elapsed = time.perf_counter() - start
+        _print_timing(f"upvote_report with {workers} threads", total_clicks, elapsed)
+
+        accepted = sum(1 for success, _ in results if success)
+        errors = [message for success, message in results if not success and "already upvoted" not in message]
+        mismatches = {}
+        for report in db["waste_reports"].find({"_id": {"$in": result.inserted_ids}}):
+            report_id = str(report["_id"])
+            observed = (report["upvotes"], db["report_upvotes"].count_documents({"report_id": report["_id"]}))
+            if observed != (expected[report_id], expected[report_id]):
+                mismatches[report_id] = observed + (expected[report_id],)
+
+        print(f"Accepted upvotes: {accepted}, duplicates rejected: {total_clicks - accepted - len(errors)}, errors: {len(errors)}")
+        if mismatches:
+            print(f"FAILED: (upvotes, upvoters, distinct users) differ for {mismatches}")
+        else:
+            print("OK: every report counter matches its distinct upvoters")
+        return not mismatches and not errors
+    finally:
+        db["waste_reports"].delete_many({"_id": {"$in": result.inserted_ids}})
+        db["report_upvotes"].delete_many({"report_id": {"$in": result.inserted_ids}})
+
+
+SEARCH_MATERIALS = ["copper wire", "aluminium sheets", "cardboard boxes", "pet bottles", "teak offcuts",
+                    "steel rods", "circuit boards", "glass jars", "plastic crates", "brass fittings"]
+SEARCH_LOCATIONS = ["Whitefield", "Koramangala", "Indiranagar", "Jayanagar", "Hebbal", "HSR Layout"]
+
+
+def bench_listing_search(listings=20000, queries=50, page_size=10, seed=42):
+    """
+    Compares the text-index search with the previous approach of loading every active listing
+    and scanning descriptions and locations in Python, on the same synthetic listings.
+    """
+    from datetime import datetime
+    from database import init_database, get_seller_listings, search_seller_listings
+
+    db = init_database()
+    if not db:
+        raise SystemExit("Database connection error")
+
+    rng = random.Random(seed)
+    bench_user = f"{BENCH_PREFIX}seller"
+    db.seller_listings.insert_many([
+        {
+            "user": bench_user,
+            "waste_type": "Others",
+            "description": f"{rng.choice(SEARCH_MATERIALS)} and {rng.choice(SEARCH_MATERIALS)}, {rng.randint(1, 500)} kg available",
+            "location": rng.choice(SEARCH_LOCATIONS),
+            "price": rng.randint(10, 5000),
+            "status": "Active",
+            "created_at": datetime.now()
+        }
+        for _ in range(listings)
+    ])
+    searches = [f"{rng.choice(SEARCH_MATERIALS)} {rng.choice(SEARCH_LOCATIONS)}" for _ in range(queries)]
+    query = {"status": "Active", "user": bench_user}
+
+    try:
+        start = time.perf_counter()
+        search_pages = [search_seller_listings(text, query, page_size=page_size)[0] for text in searches]
+        _print_timing("text index search", queries, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        scan_matches = []
+        for text in searches:
+            terms = text.lower().split()
+            scan_matches.append([
+                listing for listing in get_seller_listings(query)
+                if all(term in f"{listing['description']} {listing['location']}".lower() for term in terms)
+            ])
+        _print_timing("load all and scan", queries, time.perf_counter() - start)
+
+        # The two do not match the same set: the scan needs every term as a substring, while the text
+        # index stems terms and ranks listings matching any of them. Report how many scan matches
+        # rank onto the first search page.
+        found = sum(
+            len({m["_id"] for m in matches} & {doc["_id"] for doc in page})
+            for page, matches in zip(search_pages, scan_matches)
+        )
+        expected = sum(min(len(matches), page_size) for matches in scan_matches)
+        print(f"Scan matches on the first search page: {found} of {expected} "
+              f"(scan found {sum(len(matches) for matches in scan_matches)} in total)")
+        return True
+    finally:
+        db.seller_listings.delete_many({"user": bench_user})
+
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def _load_image_corpus(corpus_dir, synthetic_images, seed):
+    """Returns [(name, bytes)] from corpus_dir, or synthetic 12 MP phone-style JPEGs when it is None."""
+    if corpus_dir:
+        return [
+            (name, open(os.path.join(corpus_dir, name), "rb").read())
+            for name in sorted(os.listdir(corpus_dir)) if name.lower().endswith(IMAGE_EXTENSIONS)
+        ]
+
+    from io import BytesIO
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(synthetic_images):
+        image = Image.effect_noise((4032, 3024), rng.randint(20, 60)).convert("RGB")
+        draw = ImageDraw.Draw(image)
+        for _ in range(40):
+            x, y = rng.randrange(4032), rng.randrange(3024)
+            draw.ellipse((x, y, x + rng.randint(100, 900), y + rng.randint(100, 900)),
+                         fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Rotated, as most portrait phone photos are stored
+        output = BytesIO()
+        image.save(output, format="JPEG", quality=92, exif=exif)
+        corpus.append((f"synthetic-{i}.jpg", output.getvalue()))
+    return corpus
+
+
+def bench_image_preprocessing(corpus_dir=None, synthetic_images=5, max_dimension=None, uplink_mbps=10.0,
+                              upload_key=None, seed=42):
+    """
+    Measures what the EcoSmart upload preprocessing saves per photo: bytes on the wire, the
+    time spent preprocessing, and the upload time, either estimated at uplink_mbps or, with
+    an imgbb upload_key, measured by uploading both versions of every photo.
+    """
+    import http_client
+    from image_prep import prepare_image_for_upload, UPLOAD_MAX_DIMENSION
+
+    max_dimension = max_dimension or UPLOAD_MAX_DIMENSION
+    corpus = _load_image_corpus(corpus_dir, synthetic_images, seed)
+    if not corpus:
+        raise SystemExit(f"No {', '.join(IMAGE_EXTENSIONS)} images found in {corpus_dir}")
+
+    def upload_seconds(image_bytes):
+        if not upload_key:
+            return len(image_bytes) * 8 / (uplink_mbps * 1_000_000)
+        start = time.perf_counter()
+        response = http_client.post("imgbb", "https://api.imgbb.com/1/upload",
+                                    files={"image": image_bytes}, data={"key": upload_key, "expiration": 60})
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    totals = {"original_bytes": 0, "prepared_bytes": 0, "prepare_seconds": 0.0,
+              "original_upload_seconds": 0.0, "prepared_upload_seconds": 0.0}
+    for name, image_bytes in corpus:
+        start = time.perf_counter()
+        prepared = prepare_image_for_upload(image_bytes, max_dimension=max_dimension)
+        prepare_seconds = time.perf_counter() - start
+        original_upload, prepared_upload = upload_seconds(image_bytes), upload_seconds(prepared)
+
+        totals["original_bytes"] += len(image_bytes)
+        totals["prepared_bytes"] += len(prepared)
+        totals["prepare_seconds"] += prepare_seconds
+        totals["original_upload_seconds"] += original_upload
+        totals["prepared_upload_seconds"] += prepared_upload
+        print(f"{name}: {len(image_bytes) / 1024:.0f} KiB -> {len(prepared) / 1024:.0f} KiB, "
+              f"prepare {prepare_seconds * 1000:.0f} ms, upload {original_upload:.2f}s -> {prepared_upload:.2f}s")
+
+    upload_label = "measured imgbb upload" if upload_key else f"estimated upload at {uplink_mbps:g} Mbit/s"
+    print(f"Total bytes: {totals['original_bytes'] / 1048576:.1f} MiB -> {totals['prepared_bytes'] / 1048576:.1f} MiB "
+          f"({1 - totals['prepared_bytes'] / totals['original_bytes']:.0%} smaller)")
+    print(f"Preprocessing: {totals['prepare_seconds'] / len(corpus) * 1000:.0f} ms per image")
+    print(f"{upload_label}: {totals['original_upload_seconds']:.2f}s -> "
+          f"{totals['prepare_seconds'] + totals['prepared_upload_seconds']:.2f}s including preprocessing")
+    return True
+
+
+@contextmanager
+def local_mongod(replica_set, port, mongod="mongod"):
+    """
+    Starts a throwaway mongod on a temporary data directory and yields its connection string.
+    With replica_set it is initiated as a single-node replica set, which is enough for change
+    streams; without it the server is standalone, as most local installs are.
+    """
+    import pymongo
+
+    dbpath = tempfile.mkdtemp(prefix="bench-mongod-")
+    command = [mongod, "--port", str(port), "--dbpath", dbpath, "--bind_ip", "localhost", "--quiet"]
+    if replica_set:
+        command += ["--replSet", "rs0"]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    try:
+        client = pymongo.MongoClient("localhost", port, directConnection=True, serverSelectionTimeoutMS=20000)
+        client.admin.command("ping")
+        uri = f"mongodb://localhost:{port}/{BENCH_PREFIX}feed?directConnection=true"
+        if replica_set:
+            client.admin.command("replSetInitiate", {"_id": "rs0", "members": [{"_id": 0, "host": f"localhost:{port}"}]})
+            deadline = time.monotonic() + 30
+            while not client.admin.command("isMaster").get("ismaster"):
+                if time.monotonic() > deadline:
+                    raise SystemExit("Replica set did not elect a primary")
+                time.sleep(0.2)
+            uri += "&replicaSet=rs0"
+        client.close()
+        yield uri
+    finally:
+        process.terminate()
+        process.wait()
+        shutil.rmtree(dbpath, ignore_errors=True)
+
+
+def _wait_for(condition, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def check_report_feed(expected_mode, timeout=15):
+    """
+    Runs a ReportChangeFeed against MONGODB_URI and checks that it picks the expected path and
+    records inserts, updates and (on change streams) deletes made directly in the database,
+    bypassing the database2 change listener.
+    """
+    from datetime import datetime
+    from database2 import connect_to_mongodb
+    from report_feed import ReportChangeFeed
+
+    db = connect_to_mongodb()
+    if db is None:
+        raise SystemExit("Database connection error")
+
+    feed = ReportChangeFeed(poll_interval=0.5)
+    feed.start()
+    if not _wait_for(lambda: feed.mode != "starting", timeout):
+        print("FAILED: feed did not start")
+        return False
+    print(f"Feed mode: {feed.mode}")
+    if feed.mode != expected_mode:
+        print(f"FAILED: expected {expected_mode}")
+        return False
+
+    def observed(report_id, operation, since):
+        _, changes = feed.changes_since(since)
+        return changes is not None and changes.get(report_id) == operation
+
+    # Polling cannot see deletions, only the in-process listener records those
+    operations = ["insert", "update", "delete"] if expected_mode == "change_stream" else ["insert", "update"]
+    report_id = None
+    ok = True
+    for operation in operations:
+        since = feed.sequence
+        start = time.perf_counter()
+        if operation == "insert":
+            now = datetime.now()
+            report_id = db["waste_reports"].insert_one(
+                {"title": f"{BENCH_PREFIX}report", "created_at": now, "updated_at": now}
+            ).inserted_id
+        elif operation == "update":
+            db["waste_reports"].update_one({"_id": report_id}, {"$set": {"updated_at": datetime.now()}})
+        else:
+            db["waste_reports"].delete_one({"_id": report_id})
+        if _wait_for(lambda: observed(report_id, operation, since), timeout):
+            print(f"{operation}: seen after {time.perf_counter() - start:.2f}s")
+        else:
+            print(f"FAILED: {operation} not seen within {timeout}s")
+            ok = False
+    db["waste_reports"].delete_many({"title": f"{BENCH_PREFIX}report"})
+    return ok
+
+
+def bench_report_feed(mongod="mongod", port=27117):
+    """
+    Stand-in for a replica set in local testing: starts a single-node replica set and then a
+    standalone mongod, and checks the report feed's change stream path and polling fallback.
+    Each check runs in a fresh process because database2 keeps one client per process.
+    """
+    ok = True
+    for replica_set, expected_mode in ((True, "change_stream"), (False, "polling")):
+        print(f"--- {'single-node replica set' if replica_set else 'standalone'} ---")
+        with local_mongod(replica_set, port, mongod) as uri:
+            result = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "feed", "--check", expected_mode],
+                env=dict(os.environ, MONGODB_URI=uri),
+            )
+        ok = ok and result.returncode == 0
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Waste management system benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    votes_parser = subparsers.add_parser("votes", help="concurrent vote recording consistency")
+    votes_parser.add_argument("--votes", type=int, default=5000)
+    votes_parser.add_argument("--voters", type=int, default=500)
+    votes_parser.add_argument("--cities", type=int, default=5)
+    votes_parser.add_argument("--workers", type=int, default=32)
+
+    upvotes_parser = subparsers.add_parser("upvotes", help="concurrent report upvote deduplication")
+    upvotes_parser.add_argument("--clicks", type=int, default=5000)
+    upvotes_parser.add_argument("--users", type=int, default=500)
+    upvotes_parser.add_argument("--reports", type=int, default=5)
+    upvotes_parser.add_argument("--workers", type=int, default=32)
+
+    search_parser = subparsers.add_parser("search", help="text search against loading and scanning every listing")
+    search_parser.add_argument("--listings", type=int, default=20000)
+    search_parser.add_argument("--queries", type=int, default=50)
+
+    images_parser = subparsers.add_parser("images", help="bytes and upload time saved by EcoSmart image preprocessing")
+    images_parser.add_argument("--corpus", help="directory of sample photos; synthetic photos are used when omitted")
+    images_parser.add_argument("--synthetic-images", type=int, default=5)
+    images_parser.add_argument("--max-dimension", type=int)
+    images_parser.add_argument("--uplink-mbps", type=float, default=10.0)
+    images_parser.add_argument("--imgbb-key", default=os.environ.get("IMGBB_API_KEY"),
+                               help="upload both versions to imgbb to measure real latency")
+
+    feed_parser = subparsers.add_parser("feed", help="report feed change stream and polling paths on local mongods")
+    feed_parser.add_argument("--mongod", default="mongod", help="mongod executable")
+    feed_parser.add_argument("--port", type=int, default=27117)
+    feed_parser.add_argument("--check", choices=["change_stream", "polling"], help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+    if args.benchmark == "votes":
+        ok = bench_concurrent_votes(args.votes, args.voters, args.cities, args.workers)
+    elif args.benchmark == "upvotes":
+        ok = bench_concurrent_upvotes(args.clicks, args.users, args.reports, args.workers)
+    elif args.benchmark == "search":
+        ok = bench_listing_search(args.listings, args.queries)
+    elif args.benchmark == "images":
+        ok = bench_image_preprocessing(args.corpus, args.synthetic_images, args.max_dimension,
+                                       args.uplink_mbps, args.imgbb_key)
+    elif args.benchmark == "feed":
+        ok = check_report_feed(args.check) if args.check else bench_report_feed(args.mongod, args.port)
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
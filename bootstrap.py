@@ -0,0 +1,140 @@
+import argparse
+import threading
+from datetime import datetime
+import pymongo
+from database2 import (
+    connect_to_mongodb,
+    discard_stale_registration_stats,
+    initialize_admin_accounts,
+    initialize_cities_data,
+    SCHEMA_VERSION_ID,
+)
+
+_bootstrapped = False
+_bootstrap_lock = threading.Lock()
+
+
+def _seed_defaults(db):
+    """Creates the default admin account and the initial cities."""
+    initialize_admin_accounts()
+    initialize_cities_data()
+
+
+def _move_embedded_comments(db):
+    """Moves comments embedded in waste reports into report_comments and sets comment_count."""
+    waste_reports = db["waste_reports"]
+    comments_collection = db["report_comments"]
+    for report in waste_reports.find({"comments": {"$exists": True}}, {"comments": 1}):
+        operations = []
+        for index, comment in enumerate(report.get("comments") or []):
+            comment = dict(comment, report_id=report["_id"], legacy_index=index)
+            # Upsert on the comment's position in the old array so a re-run does not duplicate it,
+            # while identical comments (e.g. a double submit) are still kept apart
+            operations.append(pymongo.ReplaceOne(
+                {"report_id": report["_id"], "legacy_index": index},
+                comment,
+                upsert=True
+            ))
+        if operations:
+            comments_collection.bulk_write(operations, ordered=False)
+        waste_reports.update_one(
+            {"_id": report["_id"]},
+            {
+                "$set": {"comment_count": comments_collection.count_documents({"report_id": report["_id"]})},
+                "$unset": {"comments": ""}
+            }
+        )
+    waste_reports.update_many({"comment_count": {"$exists": False}}, {"$set": {"comment_count": 0}})
+
+
+def _backfill_report_severity(db):
+    """Sets severity 3, the level older reports were always shown and filtered with, where it is missing."""
+    db["waste_reports"].update_many({"severity": {"$exists": False}}, {"$set": {"severity": 3}})
+
+
+# Ordered (version, description, step) migrations; every step must be safe to re-run
+MIGRATIONS = [
+    (1, "Seed default admin account and cities", _seed_defaults),
+    (2, "Move embedded report comments into report_comments", _move_embedded_comments),
+    (3, "Backfill missing waste report severity", _backfill_report_severity),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(db):
+    """Returns the schema version recorded in app_settings, or 0 for a fresh database."""
+    version_doc = db["app_settings"].find_one({"_id": SCHEMA_VERSION_ID})
+    return version_doc.get("version", 0) if version_doc else 0
+
+
+def run_migrations(db=None):
+    """
+    Applies every migration newer than the recorded schema version and records each one.
+    Returns the list of (version, description) steps that ran.
+    """
+    if db is None:
+        db = connect_to_mongodb()
+    if db is None:
+        raise RuntimeError("Database connection error")
+
+    current_version = get_schema_version(db)
+    applied = []
+    for version, description, step in MIGRATIONS:
+        if version <= current_version:
+            continue
+        step(db)
+        # $max keeps the version from moving backwards if another process migrated concurrently
+        db["app_settings"].update_one(
+            {"_id": SCHEMA_VERSION_ID},
+            {"$max": {"version": version}, "$set": {"updated_at": datetime.now()}},
+            upsert=True
+        )
+        applied.append((version, description))
+    return applied
+
+
+def bootstrap_once():
+    """
+    Runs the migrations, and drops registration stats left over from a run with
+    MATERIALIZED_REGISTRATION_STATS on, once per process; later calls return immediately.
+    """
+    global _bootstrapped
+    if _bootstrapped:
+        return
+    with _bootstrap_lock:
+        if _bootstrapped:
+            return
+        db = connect_to_mongodb()
+        if db is None:
+            return
+        if get_schema_version(db) < SCHEMA_VERSION:
+            for version, description in run_migrations(db):
+                print(f"Applied migration {version}: {description}")
+        discard_stale_registration_stats(db)
+        _bootstrapped = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CleanCities database migrations")
+    parser.add_argument("--status", action="store_true", help="show the schema version without migrating")
+    args = parser.parse_args()
+
+    db = connect_to_mongodb()
+    if db is None:
+        raise SystemExit("Database connection error")
+
+    current_version = get_schema_version(db)
+    print(f"Schema version: {current_version} (latest {SCHEMA_VERSION})")
+    if args.status:
+        return
+
+    applied = run_migrations(db)
+    for version, description in applied:
+        print(f"Applied migration {version}: {description}")
+    if not applied:
+        print("Database is up to date.")
+
+
+if __name__ == "__main__":
+    main()
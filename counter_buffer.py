@@ -0,0 +1,105 @@
+import threading
+from collections import defaultdict, Counter
+import pymongo
+
+DEFAULT_FLUSH_INTERVAL_MS = 500
+DEFAULT_MAX_PENDING_EVENTS = 200
+
+
+class CounterBuffer:
+    """
+    Write-behind aggregator for $inc counters on documents matched by `key_field`.
+    Increments are coalesced in memory per document and flushed with one bulk_write
+    every flush_interval_ms, or sooner once max_pending_events have been added.
+    """
+
+    def __init__(self, get_collection, key_field="name", flush_interval_ms=DEFAULT_FLUSH_INTERVAL_MS,
+                 max_pending_events=DEFAULT_MAX_PENDING_EVENTS, on_flush=None):
+        self._get_collection = get_collection
+        self._key_field = key_field
+        self._flush_interval = flush_interval_ms / 1000
+        self._max_pending_events = max_pending_events
+        self._on_flush = on_flush
+        self._pending = defaultdict(Counter)
+        self._pending_events = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def add(self, key, field, delta=1):
+        """Queues an increment of `field` on the document whose key_field equals `key`."""
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError("CounterBuffer is closed")
+            self._pending[key][field] += delta
+            self._pending_events += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="counter-buffer", daemon=True)
+                self._thread.start()
+            if self._pending_events >= self._max_pending_events:
+                self._wake.set()
+
+    def pending(self):
+        """Returns a snapshot of the deltas that have not been flushed yet."""
+        with self._lock:
+            return {key: dict(deltas) for key, deltas in self._pending.items()}
+
+    def flush(self):
+        """Writes all pending deltas with one bulk_write; returns the number of documents updated."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, defaultdict(Counter)
+                self._pending_events = 0
+
+            keys = [key for key, deltas in pending.items() if any(deltas.values())]
+            operations = [pymongo.UpdateOne({self._key_field: key}, {"$inc": dict(pending[key])}) for key in keys]
+            if not operations:
+                return 0
+
+            applied = len(operations)
+            try:
+                collection = self._get_collection()
+                if collection is None:
+                    raise pymongo.errors.ConnectionFailure("Database connection error")
+                collection.bulk_write(operations, ordered=False)
+            except pymongo.errors.BulkWriteError as e:
+                # The unordered bulk applied every update except the listed ones; retry only those
+                failed_keys = [keys[error["index"]] for error in e.details.get("writeErrors", [])]
+                self._restore({key: pending[key] for key in failed_keys})
+                print(f"Error flushing {len(failed_keys)} counters, will retry: {e}")
+                applied -= len(failed_keys)
+            except pymongo.errors.PyMongoError as e:
+                # Connection and server errors fail the whole bulk; put all deltas back for the next flush
+                self._restore(pending)
+                print(f"Error flushing counters, will retry: {e}")
+                return 0
+
+            if applied and self._on_flush is not None:
+                self._on_flush()
+            return applied
+
+    def _restore(self, deltas_by_key):
+        with self._lock:
+            for key, deltas in deltas_by_key.items():
+                self._pending[key].update(deltas)
+                self._pending_events += 1
+
+    def close(self):
+        """Stops the background flusher and writes any remaining deltas."""
+        with self._lock:
+            self._stopped = True
+            thread = self._thread
+        self._wake.set()
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self._flush_interval)
+            self._wake.clear()
+            if self._stopped:
+                return
+            self.flush()
@@ -1,14 +1,80 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, DESCENDING
 import streamlit as st
 import urllib.parse
 from bson.objectid import ObjectId
 import sys
 import ssl
+import os
+import threading
+import time
 from datetime import datetime  # Add this import for datetime
+from indexes import EXCHANGE_INDEXES, ensure_indexes_once
+import media_store
+
+# Process-wide client shared by every Streamlit session and rerun
+_client = None
+_client_lock = threading.Lock()
+_last_health_check = 0.0
+
+DEFAULT_MAX_POOL_SIZE = 50
+DEFAULT_PAGE_SIZE = 10
+
+# Summary projection for list reads: leaves out the inline base64 image
+LISTING_SUMMARY_PROJECTION = {"image": 0}
+
+# Default ordering for listing reads, matching the (created_at, _id) indexes
+NEWEST_FIRST = [("created_at", DESCENDING), ("_id", DESCENDING)]
+HEALTH_CHECK_INTERVAL_SECONDS = 30
+
+def get_max_pool_size():
+    """Returns the connection pool size from secrets or MONGO_MAX_POOL_SIZE, falling back to the default."""
+    try:
+        if 'mongo' in st.secrets and "max_pool_size" in st.secrets["mongo"]:
+            return int(st.secrets["mongo"]["max_pool_size"])
+    except Exception:
+        pass
+    return int(os.environ.get("MONGO_MAX_POOL_SIZE", DEFAULT_MAX_POOL_SIZE))
 
 def init_connection():
     """
-    Initializes the MongoDB connection using credentials from Streamlit secrets.
+    Returns the shared, pooled MongoClient, creating it on first use.
+    The client is pinged at most once per HEALTH_CHECK_INTERVAL_SECONDS and
+    rebuilt if the ping fails, so regular calls never pay for a handshake.
+    """
+    global _client, _last_health_check
+
+    client = _client
+    if client is not None and time.monotonic() - _last_health_check < HEALTH_CHECK_INTERVAL_SECONDS:
+        return client
+
+    with _client_lock:
+        if _client is not None:
+            if time.monotonic() - _last_health_check < HEALTH_CHECK_INTERVAL_SECONDS:
+                return _client
+            try:
+                _client.admin.command('ping')
+                _last_health_check = time.monotonic()
+                return _client
+            except Exception:
+                _client.close()
+                _client = None
+
+        _client = _create_client()
+        if _client is not None:
+            _last_health_check = time.monotonic()
+        return _client
+
+def close_connection():
+    """Closes the shared client so the next call reconnects."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+def _create_client():
+    """
+    Creates the MongoDB client using credentials from Streamlit secrets.
     Uses custom SSL context which was proven to work.
     """
     try:
@@ -45,7 +111,8 @@ def init_connection():
                     uri,
                     ssl=True, 
                     ssl_cert_reqs=ssl.CERT_NONE,
-                    serverSelectionTimeoutMS=5000
+                    serverSelectionTimeoutMS=5000,
+                    maxPoolSize=get_max_pool_size()
                 )
                 
                 # Test the connection
@@ -86,6 +153,7 @@ def init_database():
         try:
             db_name = st.secrets["mongo"]["db"]
             db = client[db_name]
+            ensure_indexes_once(db, EXCHANGE_INDEXES)
             return db
         except Exception as e:
             st.error(f"Error accessing database: {e}")
@@ -135,15 +203,43 @@ def create_seller_listing(listing_data):
             return False, str(e)
     return False, "Database connection failed"
 
-def get_seller_listings(query=None):
-    """Retrieves seller listings from the database, optionally filtered by a query."""
+def get_seller_listings(query=None, projection=LISTING_SUMMARY_PROJECTION, sort=NEWEST_FIRST, limit=0):
+    """
+    Retrieves seller listings from the database, optionally filtered by a query.
+    Ordering and top-N limits are applied by MongoDB; a limit of 0 means no limit.
+    Returns summaries without the image by default; pass projection=None for full documents.
+    """
     db = init_database()
     if db:
         if query is None:
             query = {"status": "Active"}
-        return list(db.seller_listings.find(query).sort("created_at", -1))
+        return list(db.seller_listings.find(query, projection).sort(sort).limit(limit))
     return []
 
+def get_seller_listings_page(query=None, sort=NEWEST_FIRST, page_size=DEFAULT_PAGE_SIZE, after=None, projection=LISTING_SUMMARY_PROJECTION):
+    """
+    Retrieves one page of seller listings ordered by a [(field, direction), ("_id", direction)] sort.
+    Returns (listings, next_cursor); pass next_cursor as `after` to get the following page.
+    """
+    if query is None:
+        query = {"status": "Active"}
+    return _get_page("seller_listings", query, sort, page_size, after, projection)
+
+def get_media_store():
+    """Returns the media store that holds listing images and thumbnails."""
+    db = init_database()
+    if db:
+        return media_store.get_media_store(db)
+    return None
+
+def get_listing_images(listing_ids):
+    """Retrieves the inline images of legacy seller listings in one query, as a dict keyed by listing _id."""
+    db = init_database()
+    if db and listing_ids:
+        cursor = db.seller_listings.find({"_id": {"$in": list(listing_ids)}}, {"image": 1})
+        return {doc["_id"]: doc.get("image") for doc in cursor}
+    return {}
+
 def create_buyer_request(request_data):
     """Creates a new buyer request in the database."""
     db = init_database()
@@ -159,15 +255,142 @@ def create_buyer_request(request_data):
             return False, str(e)
     return False, "Database connection failed"
 
-def get_buyer_requests(query=None):
-    """Retrieves buyer requests from the database, optionally filtered by a query."""
+def get_buyer_requests(query=None, sort=NEWEST_FIRST, limit=0):
+    """
+    Retrieves buyer requests from the database, optionally filtered by a query.
+    Ordering and top-N limits are applied by MongoDB; a limit of 0 means no limit.
+    """
     db = init_database()
     if db:
         if query is None:
             query = {"status": "Active"}
-        return list(db.buyer_requests.find(query).sort("created_at", -1))
+        return list(db.buyer_requests.find(query).sort(sort).limit(limit))
     return []
 
+def get_buyer_requests_page(query=None, sort=NEWEST_FIRST, page_size=DEFAULT_PAGE_SIZE, after=None):
+    """
+    Retrieves one page of buyer requests ordered by a [(field, direction), ("_id", direction)] sort.
+    Returns (requests, next_cursor); pass next_cursor as `after` to get the following page.
+    """
+    if query is None:
+        query = {"status": "Active"}
+    return _get_page("buyer_requests", query, sort, page_size, after)
+
+def _get_page(collection_name, query, sort, page_size, after, projection=None):
+    """
+    Keyset pagination over (sort field, _id). The cursor is the (value, _id) pair of the
+    last document of the previous page, so each page is a bounded index range scan.
+    """
+    db = init_database()
+    if db:
+        sort_field, direction = sort[0]
+        if after is not None:
+            last_value, last_id = after
+            op = "$lt" if direction == DESCENDING else "$gt"
+            query = {"$and": [query, {"$or": [
+                {sort_field: {op: last_value}},
+                {sort_field: last_value, "_id": {op: last_id}}
+            ]}]}
+        documents = list(
+            db[collection_name].find(query, projection)
+            .sort([(sort_field, direction), ("_id", direction)])
+            .limit(page_size + 1)
+        )
+        next_cursor = None
+        if len(documents) > page_size:
+            documents = documents[:page_size]
+            next_cursor = (documents[-1].get(sort_field), documents[-1]["_id"])
+        return documents, next_cursor
+    return [], None
+
+def _text_search(collection_name, text, query, page, page_size, projection):
+    """
+    Runs a $text search ranked by relevance, newest first among equal scores.
+    Returns (documents, has_more) for the zero-based `page`; each document carries its "score".
+    """
+    db = init_database()
+    if db:
+        search_query = dict(query or {})
+        search_query["$text"] = {"$search": text}
+        search_projection = dict(projection or {})
+        search_projection["score"] = {"$meta": "textScore"}
+        documents = list(
+            db[collection_name].find(search_query, search_projection)
+            .sort([("score", {"$meta": "textScore"}), ("created_at", DESCENDING)])
+            .skip(page * page_size)
+            .limit(page_size + 1)
+        )
+        return documents[:page_size], len(documents) > page_size
+    return [], False
+
+def search_seller_listings(text, query=None, page=0, page_size=DEFAULT_PAGE_SIZE, projection=LISTING_SUMMARY_PROJECTION):
+    """
+    Full-text search over listing descriptions, locations and waste types, e.g. "copper wire Whitefield".
+    Only active listings are searched unless a query is given. Returns (listings, has_more).
+    """
+    if query is None:
+        query = {"status": "Active"}
+    return _text_search("seller_listings", text, query, page, page_size, projection)
+
+def search_buyer_requests(text, query=None, page=0, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Full-text search over buyer request requirements, locations and waste types.
+    Only active requests are searched unless a query is given. Returns (requests, has_more).
+    """
+    if query is None:
+        query = {"status": "Active"}
+    return _text_search("buyer_requests", text, query, page, page_size, None)
+
+def get_exchange_dashboard_stats(username, recent_limit=3):
+    """
+    Computes the dashboard numbers in a single aggregation: active listing and request
+    counts, the user's active posts, the waste type histogram and the most recent listings.
+    Buyer requests are folded in with $unionWith so one $facet answers everything.
+    """
+    db = init_database()
+    if db:
+        pipeline = [
+            {"$match": {"status": "Active"}},
+            {"$project": {"image": 0}},
+            {"$addFields": {"_source": {"$literal": "seller_listings"}}},
+            {"$unionWith": {
+                "coll": "buyer_requests",
+                "pipeline": [
+                    {"$match": {"status": "Active"}},
+                    {"$project": {"user": 1, "_source": {"$literal": "buyer_requests"}}}
+                ]
+            }},
+            {"$facet": {
+                "seller_count": [{"$match": {"_source": "seller_listings"}}, {"$count": "count"}],
+                "buyer_count": [{"$match": {"_source": "buyer_requests"}}, {"$count": "count"}],
+                "my_count": [{"$match": {"user": username}}, {"$count": "count"}],
+                "waste_types": [
+                    {"$match": {"_source": "seller_listings"}},
+                    {"$group": {"_id": "$waste_type", "count": {"$sum": 1}}},
+                    {"$sort": {"count": -1, "_id": 1}}
+                ],
+                "recent_listings": [
+                    {"$match": {"_source": "seller_listings"}},
+                    {"$sort": {"created_at": -1, "_id": -1}},
+                    {"$limit": recent_limit},
+                    {"$project": {"_source": 0}}
+                ]
+            }}
+        ]
+        result = next(db.seller_listings.aggregate(pipeline), {})
+
+        def count(facet):
+            return result[facet][0]["count"] if result.get(facet) else 0
+
+        return {
+            "active_listings": count("seller_count"),
+            "active_requests": count("buyer_count"),
+            "my_active_posts": count("my_count"),
+            "waste_types": [(item["_id"], item["count"]) for item in result.get("waste_types", [])],
+            "recent_listings": result.get("recent_listings", [])
+        }
+    return {"active_listings": 0, "active_requests": 0, "my_active_posts": 0, "waste_types": [], "recent_listings": []}
+
 def update_listing_status(listing_id, collection_name, new_status):
     """Updates the status of a listing (seller or buyer) in the database."""
     db = init_database()
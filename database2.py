@@ -8,12 +8,226 @@ from bson.objectid import ObjectId
 import os
 import urllib.parse
 import ssl
+import threading
+import time
+import atexit
+import csv
+import io
+import json
+import importlib.util
+import tempfile
+from collections import Counter
 import streamlit as st
+from counter_buffer import CounterBuffer, DEFAULT_FLUSH_INTERVAL_MS, DEFAULT_MAX_PENDING_EVENTS
+from indexes import AWARENESS_INDEXES, ensure_indexes_once
+import media_store
+
+# Long-lived client and database handle shared by every session and rerun
+_client = None
+_db = None
+_client_lock = threading.Lock()
+_last_health_check = 0.0
+_connections_created = 0
+
+DEFAULT_MAX_POOL_SIZE = 50
+HEALTH_CHECK_INTERVAL_SECONDS = 30
+
+# Summary projection for report lists: leaves out the inline base64 image and any
+# comments still embedded by older versions
+REPORT_SUMMARY_PROJECTION = {"image": 0, "comments": 0}
+COMMENTS_PAGE_SIZE = 10
+
+# Report list filters and sort orders, keyed by the labels shown in the UI
+REPORT_STATUS_FILTERS = {
+    "Pending": {"tag_bbmp": {"$ne": True}, "resolved": {"$ne": True}},
+    "Tagged for BBMP": {"tag_bbmp": True},
+    "Resolved": {"resolved": True},
+}
+REPORT_SORT_OPTIONS = {
+    "Newest First": [("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)],
+    "Oldest First": [("created_at", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)],
+    "Most Upvotes": [("upvotes", pymongo.DESCENDING), ("created_at", pymongo.DESCENDING)],
+    "Severity (High to Low)": [("severity", pymongo.DESCENDING), ("created_at", pymongo.DESCENDING)],
+}
+DEFAULT_REPORT_LIMIT = 50
+
+REGISTRATION_TIME_SLOTS = ["Any Time", "Morning (8 AM - 12 PM)", "Afternoon (12 PM - 4 PM)", "Evening (4 PM - 8 PM)"]
+DEFAULT_IMPORT_CHUNK_SIZE = 500
+
+# Columns of the registrations download, and how many documents are read per batch
+REGISTRATION_EXPORT_FIELDS = ["name", "email", "city", "time_slot"]
+EXPORT_BATCH_SIZE = 1000
+
+# Optional materialized registration stats (MATERIALIZED_REGISTRATION_STATS=1)
+REGISTRATION_STATS_ID = "registrations"
+
+# app_settings holds the campaign settings document and the schema version document
+SCHEMA_VERSION_ID = "schema_version"
+CAMPAIGN_SETTINGS_FILTER = {"_id": {"$ne": SCHEMA_VERSION_ID}}
+
+# Read-through cache for rarely changing data (cities, campaign settings)
+DEFAULT_CACHE_TTL_SECONDS = 30
+CITIES_CACHE_KEY = "cities"
+SETTINGS_CACHE_KEY = "app_settings"
+_read_cache = {}
+_read_cache_lock = threading.Lock()
+_cache_generation = 0
+
+# Optional write-behind buffer for city vote/registration counters (WRITE_BEHIND_COUNTERS=1)
+_counter_buffer = None
+_counter_buffer_lock = threading.Lock()
+
+# Callbacks notified with (report_id, operation) after every waste report write
+_report_change_listeners = []
+
+def get_max_pool_size():
+    """Returns the pool size from MONGO_MAX_POOL_SIZE or Streamlit secrets, falling back to the default."""
+    pool_size = os.environ.get("MONGO_MAX_POOL_SIZE")
+    if not pool_size:
+        try:
+            if 'mongo' in st.secrets:
+                pool_size = st.secrets["mongo"].get("max_pool_size")
+        except Exception:
+            pool_size = None
+    return int(pool_size or DEFAULT_MAX_POOL_SIZE)
 
 def connect_to_mongodb():
+    """Returns the shared database handle, reconnecting if the cached client stops responding."""
+    global _client, _db, _last_health_check
+
+    db = _db
+    if db is not None and time.monotonic() - _last_health_check < HEALTH_CHECK_INTERVAL_SECONDS:
+        return db
+
+    with _client_lock:
+        if _db is not None:
+            if time.monotonic() - _last_health_check < HEALTH_CHECK_INTERVAL_SECONDS:
+                return _db
+            try:
+                _client.admin.command('ping')
+                _last_health_check = time.monotonic()
+                return _db
+            except pymongo.errors.PyMongoError as e:
+                print(f"MongoDB health check failed, reconnecting: {e}")
+                _client.close()
+                _client, _db = None, None
+
+        _client, _db = _create_connection()
+        if _db is not None:
+            _last_health_check = time.monotonic()
+            ensure_indexes_once(_db, AWARENESS_INDEXES)
+        return _db
+
+def close_mongodb_connection():
+    """Closes the shared client so the next call reconnects."""
+    global _client, _db
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client, _db = None, None
+
+def get_cache_ttl():
+    """Returns the read cache TTL in seconds from CACHE_TTL_SECONDS, falling back to the default."""
+    return float(os.environ.get("CACHE_TTL_SECONDS", DEFAULT_CACHE_TTL_SECONDS))
+
+def _cached_read(key, loader):
+    """
+    Returns the cached value for key, calling loader() when it is missing or expired.
+    A value loaded while an invalidation happened is not stored, so our own writes are never hidden.
+    """
+    entry = _read_cache.get(key)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+
+    generation = _cache_generation
+    value = loader()
+    if value is not None:
+        with _read_cache_lock:
+            if generation == _cache_generation:
+                _read_cache[key] = (time.monotonic() + get_cache_ttl(), value)
+    return value
+
+def invalidate_cache(*keys):
+    """Drops the given cache entries, or the whole read cache when no keys are given."""
+    global _cache_generation
+    with _read_cache_lock:
+        _cache_generation += 1
+        if keys:
+            for key in keys:
+                _read_cache.pop(key, None)
+        else:
+            _read_cache.clear()
+
+def get_counter_buffer():
+    """
+    Returns the shared write-behind buffer for city counters, or None when WRITE_BEHIND_COUNTERS is off.
+    Flush timing comes from WRITE_BEHIND_FLUSH_MS and WRITE_BEHIND_MAX_EVENTS.
+    """
+    global _counter_buffer
+    if os.environ.get("WRITE_BEHIND_COUNTERS", "0").lower() not in ("1", "true", "yes"):
+        return None
+    if _counter_buffer is None:
+        with _counter_buffer_lock:
+            if _counter_buffer is None:
+                def get_cities_collection():
+                    db = connect_to_mongodb()
+                    return db["cities"] if db is not None else None
+
+                _counter_buffer = CounterBuffer(
+                    get_cities_collection,
+                    flush_interval_ms=int(os.environ.get("WRITE_BEHIND_FLUSH_MS", DEFAULT_FLUSH_INTERVAL_MS)),
+                    max_pending_events=int(os.environ.get("WRITE_BEHIND_MAX_EVENTS", DEFAULT_MAX_PENDING_EVENTS)),
+                    on_flush=lambda: invalidate_cache(CITIES_CACHE_KEY)
+                )
+                # Flush pending deltas on interpreter shutdown
+                atexit.register(_counter_buffer.close)
+    return _counter_buffer
+
+def add_report_change_listener(listener):
+    """Registers a callback invoked with (report_id, operation) whenever a waste report is written."""
+    if listener not in _report_change_listeners:
+        _report_change_listeners.append(listener)
+
+def _notify_report_change(report_id, operation):
+    for listener in _report_change_listeners:
+        try:
+            listener(report_id, operation)
+        except Exception as e:
+            print(f"Report change listener failed: {e}")
+
+def flush_counter_buffer():
+    """Writes any buffered counter deltas now; a no-op when write-behind is off."""
+    counter_buffer = get_counter_buffer()
+    if counter_buffer is not None:
+        counter_buffer.flush()
+
+def _increment_city_counters(db, increments):
+    """
+    Applies (city, field, delta) increments to the cities collection, either through the
+    write-behind buffer or directly with a single bulk_write.
+    """
+    counter_buffer = get_counter_buffer()
+    if counter_buffer is not None:
+        for city_name, field, delta in increments:
+            counter_buffer.add(city_name, field, delta)
+        return
+
+    db["cities"].bulk_write([
+        pymongo.UpdateOne({"name": city_name}, {"$inc": {field: delta}})
+        for city_name, field, delta in increments
+    ], ordered=False)
+    invalidate_cache(CITIES_CACHE_KEY)
+
+def get_connection_stats():
+    """Returns how many clients have been created, to verify connection reuse."""
+    return {"connections_created": _connections_created, "connected": _db is not None}
+
+def _create_connection():
     """Connects to the MongoDB Atlas database using Streamlit secrets or environment variable."""
+    global _connections_created
     try:
         connection_string = os.environ.get("MONGODB_URI")
+        max_pool_size = get_max_pool_size()
 
         if not connection_string and 'mongo' in st.secrets:
             username = st.secrets["mongo"]["username"]
@@ -25,26 +239,27 @@ def connect_to_mongodb():
             password_encoded = urllib.parse.quote_plus(password)
 
             connection_string = f"mongodb+srv://{username_encoded}:{password_encoded}@{cluster_url}/{db_name}?retryWrites=true&w=majority"
-            client = pymongo.MongoClient(connection_string)
+            client = pymongo.MongoClient(connection_string, maxPoolSize=max_pool_size)
 
         elif not connection_string:
             st.error("MongoDB connection string not found in environment or Streamlit secrets.")
-            return None
+            return None, None
         else:
-            client = pymongo.MongoClient(connection_string)
+            client = pymongo.MongoClient(connection_string, maxPoolSize=max_pool_size)
             db_name = connection_string.split("/")[-1].split("?")[0] or "waste_management"
 
         client.admin.command('ping')
         db = client[db_name]
+        _connections_created += 1
         print("✅ Successfully connected to MongoDB Atlas")
-        return db
+        return client, db
 
     except pymongo.errors.ConnectionFailure as e:
         st.error(f"❌ Could not connect to MongoDB Atlas: {e}")
-        return None
+        return None, None
     except Exception as e:
         st.error(f"❌ General error connecting to MongoDB: {e}")
-        return None
+        return None, None
 
 
 # The rest of your functions remain the same, just replace the original connect_to_mongodb function
@@ -143,7 +358,8 @@ def update_campaign_dates(voting_end_date, campaign_end_date):
         return
 
     app_settings = db["app_settings"]
-    app_settings.update_one({}, {"$set": {"voting_end_date": voting_end_date, "campaign_end_date": campaign_end_date}}, upsert=True)
+    app_settings.update_one(CAMPAIGN_SETTINGS_FILTER, {"$set": {"voting_end_date": voting_end_date, "campaign_end_date": campaign_end_date}}, upsert=True)
+    invalidate_cache(SETTINGS_CACHE_KEY)
 
 def get_campaign_dates():
     """Retrieves the campaign end dates."""
@@ -151,7 +367,7 @@ def get_campaign_dates():
     if db is None:
         return datetime.now() + timedelta(days=7), datetime.now() + timedelta(days=14)
 
-    app_settings = db["app_settings"].find_one({})
+    app_settings = _cached_read(SETTINGS_CACHE_KEY, lambda: db["app_settings"].find_one(CAMPAIGN_SETTINGS_FILTER) or {})
     if app_settings:
         return app_settings.get("voting_end_date", datetime.now() + timedelta(days=7)), app_settings.get("campaign_end_date", datetime.now() + timedelta(days=14))
     else:
@@ -163,9 +379,12 @@ def reset_campaign():
     if db is None:
         return
 
+    flush_counter_buffer()
     db["cities"].update_many({}, {"$set": {"votes": 0, "registrations": 0}})
     db["voter_records"].delete_many({})
     db["registrations"].delete_many({})
+    db["registration_stats"].delete_one({"_id": REGISTRATION_STATS_ID})
+    invalidate_cache(CITIES_CACHE_KEY)
     update_campaign_dates(datetime.now() + timedelta(days=7), datetime.now() + timedelta(days=14))
 
 def add_new_city(city_name):
@@ -181,6 +400,7 @@ def add_new_city(city_name):
     import random
     waste_index = random.randint(30, 95)
     cities.insert_one({"name": city_name, "waste_index": waste_index, "votes": 0, "registrations": 0})
+    invalidate_cache(CITIES_CACHE_KEY)
     return True, f"City '{city_name}' added successfully"
 
 def update_city_waste_index(city_name, waste_index):
@@ -191,6 +411,7 @@ def update_city_waste_index(city_name, waste_index):
 
     cities = db["cities"]
     result = cities.update_one({"name": city_name}, {"$set": {"waste_index": int(waste_index)}})
+    invalidate_cache(CITIES_CACHE_KEY)
     if result.modified_count > 0:
         return True, f"Waste index for '{city_name}' updated successfully"
     else:
@@ -204,26 +425,126 @@ def delete_city(city_name):
 
     cities = db["cities"]
     result = cities.delete_one({"name": city_name})
+    invalidate_cache(CITIES_CACHE_KEY)
     if result.deleted_count > 0:
         # Also remove any associated votes and registrations
         db["voter_records"].delete_many({"city": city_name})
-        db["registrations"].delete_many({"city": city_name})
+        time_slot_counts = {
+            item["_id"]: item["count"] for item in db["registrations"].aggregate([
+                {"$match": {"city": city_name}},
+                {"$group": {"_id": "$time_slot", "count": {"$sum": 1}}}
+            ])
+        } if _materialized_stats_enabled() else {}
+        deleted = db["registrations"].delete_many({"city": city_name}).deleted_count
+        if deleted:
+            _increment_registration_stats(db, {city_name: -deleted}, {slot: -count for slot, count in time_slot_counts.items()})
         return True, f"City '{city_name}' deleted successfully"
     else:
         return False, f"City '{city_name}' not found"
 
+def _escape_stats_key(key):
+    """Makes a city or time slot name safe to use as a field name ("." and a leading "$" are reserved)."""
+    return str(key).replace("%", "%25").replace(".", "%2E").replace("$", "%24")
+
+def _unescape_stats_key(key):
+    return key.replace("%24", "$").replace("%2E", ".").replace("%25", "%")
+
+def _materialized_stats_enabled():
+    return os.environ.get("MATERIALIZED_REGISTRATION_STATS", "0").lower() in ("1", "true", "yes")
+
+def _compute_registration_stats(db, match=None):
+    """Computes total, per-city and per-time-slot registration counts in a single $facet pass."""
+    pipeline = [{"$match": match}] if match else []
+    result = list(db["registrations"].aggregate(pipeline + [
+        {"$facet": {
+            "total": [{"$count": "count"}],
+            "by_city": [{"$group": {"_id": "$city", "count": {"$sum": 1}}}],
+            "by_time_slot": [{"$group": {"_id": "$time_slot", "count": {"$sum": 1}}}]
+        }}
+    ]))
+    facets = result[0] if result else {}
+    total = facets.get("total") or [{"count": 0}]
+    return {
+        "total": total[0]["count"],
+        "by_city": facets.get("by_city", []),
+        "by_time_slot": facets.get("by_time_slot", [])
+    }
+
+def _registration_stats_from_doc(stats_doc):
+    return {
+        "total": stats_doc.get("total", 0),
+        "by_city": [{"_id": _unescape_stats_key(key), "count": count} for key, count in stats_doc.get("by_city", {}).items() if count],
+        "by_time_slot": [{"_id": _unescape_stats_key(key), "count": count} for key, count in stats_doc.get("by_time_slot", {}).items() if count]
+    }
+
+def rebuild_registration_stats(db=None):
+    """
+    Recomputes the materialized registration_stats document from the registrations collection.
+    The document is zeroed before the aggregation, which only counts registrations made before
+    that point; later ones are counted by their own increments, so none are lost while it runs.
+    """
+    db = db if db is not None else connect_to_mongodb()
+    if db is None:
+        return None
+
+    started = datetime.now()
+    stats_collection = db["registration_stats"]
+    stats_collection.replace_one(
+        {"_id": REGISTRATION_STATS_ID},
+        {"total": 0, "by_city": {}, "by_time_slot": {}, "updated_at": started},
+        upsert=True
+    )
+    stats = _compute_registration_stats(db, {"timestamp": {"$not": {"$gte": started}}})
+    increments = {"total": stats["total"]}
+    increments.update({f"by_city.{_escape_stats_key(item['_id'])}": item["count"] for item in stats["by_city"]})
+    increments.update({f"by_time_slot.{_escape_stats_key(item['_id'])}": item["count"] for item in stats["by_time_slot"]})
+    # $inc merges the counts into whatever concurrent registrations have added since the reset
+    stats_doc = stats_collection.find_one_and_update(
+        {"_id": REGISTRATION_STATS_ID},
+        {"$inc": increments},
+        upsert=True,
+        return_document=pymongo.ReturnDocument.AFTER
+    )
+    return _registration_stats_from_doc(stats_doc)
+
+def discard_stale_registration_stats(db):
+    """
+    Drops the materialized stats document while MATERIALIZED_REGISTRATION_STATS is off, since it
+    stops being updated then; it is rebuilt in full on the first read once the flag is turned on.
+    """
+    if not _materialized_stats_enabled():
+        db["registration_stats"].delete_one({"_id": REGISTRATION_STATS_ID})
+
+def _increment_registration_stats(db, city_counts, time_slot_counts):
+    """
+    Applies registration counts to the materialized stats document, if it has been built and
+    MATERIALIZED_REGISTRATION_STATS is on.
+    """
+    if not _materialized_stats_enabled():
+        return
+
+    increments = {"total": sum(city_counts.values())}
+    increments.update({f"by_city.{_escape_stats_key(city)}": count for city, count in city_counts.items()})
+    increments.update({f"by_time_slot.{_escape_stats_key(slot)}": count for slot, count in time_slot_counts.items()})
+    # No upsert: a missing document is rebuilt in full on the next read
+    db["registration_stats"].update_one({"_id": REGISTRATION_STATS_ID}, {"$inc": increments})
+
 def get_registration_stats():
-    """Retrieves registration statistics."""
+    """
+    Retrieves registration statistics. With MATERIALIZED_REGISTRATION_STATS enabled they are read
+    from the incrementally maintained registration_stats document instead of being aggregated.
+    """
     db = connect_to_mongodb()
     if db is None:
         return None
 
-    registrations = db["registrations"]
-    total_registrations = registrations.count_documents({})
-    by_city = list(registrations.aggregate([{"$group": {"_id": "$city", "count": {"$sum": 1}}}]))
-    by_time_slot = list(registrations.aggregate([{"$group": {"_id": "$time_slot", "count": {"$sum": 1}}}]))
+    if not _materialized_stats_enabled():
+        return _compute_registration_stats(db)
 
-    return {"total": total_registrations, "by_city": by_city, "by_time_slot": by_time_slot}
+    stats_doc = db["registration_stats"].find_one({"_id": REGISTRATION_STATS_ID})
+    if stats_doc is None:
+        return rebuild_registration_stats(db)
+    return _registration_stats_from_doc(stats_doc)
 
 def delete_waste_report(report_id):
     """Deletes a waste report by its ID."""
@@ -234,6 +555,9 @@ def delete_waste_report(report_id):
     waste_reports = db["waste_reports"]
     result = waste_reports.delete_one({"_id": ObjectId(report_id)})
     if result.deleted_count > 0:
+        db["report_comments"].delete_many({"report_id": ObjectId(report_id)})
+        db["report_upvotes"].delete_many({"report_id": ObjectId(report_id)})
+        _notify_report_change(ObjectId(report_id), "delete")
         return True, "Report deleted successfully"
     else:
         return False, "Report not found"
@@ -245,60 +569,196 @@ def tag_bbmp_waste_report(report_id, tag_status):
         return False, "Database connection error"
 
     waste_reports = db["waste_reports"]
-    result = waste_reports.update_one({"_id": ObjectId(report_id)}, {"$set": {"tag_bbmp": tag_status}})
+    result = waste_reports.update_one(
+        {"_id": ObjectId(report_id)},
+        {"$set": {"tag_bbmp": tag_status, "updated_at": datetime.now()}}
+    )
     if result.modified_count > 0:
+        _notify_report_change(ObjectId(report_id), "update")
         return True, f"Report {'tagged' if tag_status else 'untagged'} successfully"
     else:
         return False, "Report not found"
 
-def get_waste_reports():
-    """Fetches all waste reports."""
+def get_waste_reports(projection=REPORT_SUMMARY_PROJECTION):
+    """Fetches all waste reports, without images by default; pass projection=None for full documents."""
     db = connect_to_mongodb()
     if db is None:
         return []
 
     try:
         waste_reports_collection = db["waste_reports"]
-        reports = list(waste_reports_collection.find().sort("created_at", pymongo.DESCENDING))
+        reports = list(waste_reports_collection.find({}, projection).sort("created_at", pymongo.DESCENDING))
         return reports
     except Exception as e:
         print(f"Error retrieving waste reports: {e}")
         return []
 
+def build_report_query(city=None, status=None, severity=None):
+    """Translates the report list filters into a MongoDB filter; None means no filter on that field."""
+    query = {}
+    if city is not None:
+        query["city"] = city
+    if status is not None:
+        query.update(REPORT_STATUS_FILTERS[status])
+    if severity is not None:
+        query["severity"] = severity
+    return query
+
+def find_waste_reports(query=None, sort=REPORT_SORT_OPTIONS["Newest First"], limit=DEFAULT_REPORT_LIMIT,
+                       projection=REPORT_SUMMARY_PROJECTION):
+    """Returns at most `limit` waste reports matching a build_report_query() filter, sorted server-side."""
+    db = connect_to_mongodb()
+    if db is None:
+        return []
+
+    try:
+        return list(db["waste_reports"].find(query or {}, projection).sort(sort).limit(limit))
+    except Exception as e:
+        print(f"Error retrieving waste reports: {e}")
+        return []
+
+def count_waste_reports(query=None):
+    """Counts the waste reports matching a build_report_query() filter."""
+    db = connect_to_mongodb()
+    if db is None:
+        return 0
+    return db["waste_reports"].count_documents(query or {})
+
+def search_waste_reports(text, query=None, page=0, page_size=DEFAULT_REPORT_LIMIT, projection=REPORT_SUMMARY_PROJECTION):
+    """
+    Full-text search over report titles, descriptions, locations and cities, combined with an
+    optional build_report_query() filter. Results are ranked by relevance, newest first among
+    equal scores. Returns (reports, has_more) for the zero-based `page`.
+    """
+    db = connect_to_mongodb()
+    if db is None:
+        return [], False
+
+    search_query = dict(query or {})
+    search_query["$text"] = {"$search": text}
+    search_projection = dict(projection or {})
+    search_projection["score"] = {"$meta": "textScore"}
+    try:
+        reports = list(
+            db["waste_reports"].find(search_query, search_projection)
+            .sort([("score", {"$meta": "textScore"}), ("created_at", pymongo.DESCENDING)])
+            .skip(page * page_size)
+            .limit(page_size + 1)
+        )
+    except Exception as e:
+        print(f"Error searching waste reports: {e}")
+        return [], False
+    return reports[:page_size], len(reports) > page_size
+
+def get_report_cities():
+    """Returns the sorted names of the cities that have at least one waste report."""
+    db = connect_to_mongodb()
+    if db is None:
+        return []
+    return sorted(city for city in db["waste_reports"].distinct("city") if city)
+
+def get_media_store():
+    """Returns the media store that holds waste report images and thumbnails."""
+    db = connect_to_mongodb()
+    if db is None:
+        return None
+    return media_store.get_media_store(db)
+
+def get_report_images(report_ids):
+    """Fetches the inline images of legacy waste reports in one query, as a dict keyed by report _id."""
+    db = connect_to_mongodb()
+    if db is None or not report_ids:
+        return {}
+
+    try:
+        cursor = db["waste_reports"].find({"_id": {"$in": list(report_ids)}}, {"image": 1})
+        return {doc["_id"]: doc.get("image") for doc in cursor}
+    except Exception as e:
+        print(f"Error retrieving report images: {e}")
+        return {}
+
 def get_cities_data():
-    """Retrieves all cities data."""
+    """Retrieves all cities data, served from the read cache between writes."""
     db = connect_to_mongodb()
     if db is None:
         return []
 
     cities_collection = db["cities"]
-    cities = list(cities_collection.find())
-    return cities
+    cities = _cached_read(CITIES_CACHE_KEY, lambda: list(cities_collection.find()))
+    # Hand out copies so callers cannot modify the cached documents
+    return [dict(city) for city in cities]
 
-def record_vote(city_name):
-    """Records a vote for a city without requiring user ID."""
+def record_vote(city_name, user_id):
+    """
+    Records or moves a voter's vote for a city.
+    The voter record is switched with one atomic upsert that returns the previous city,
+    and the city counters are then adjusted with a single bulk_write (or the write-behind buffer).
+    If the counters cannot be adjusted they are recounted from voter_records instead.
+    """
     db = connect_to_mongodb()
     if db is None:
         return False, "Database connection error"
 
-    # Generate a unique session ID if needed
-    user_id = "anonymous_user"
-    
     voter_records = db["voter_records"]
-    existing_vote = voter_records.find_one({"user_id": user_id})
-
-    if existing_vote:
-        if existing_vote["city"] != city_name:
-            db["cities"].update_one({"name": existing_vote["city"]}, {"$inc": {"votes": -1}})
-            voter_records.update_one({"user_id": user_id}, {"$set": {"city": city_name}})
-            db["cities"].update_one({"name": city_name}, {"$inc": {"votes": 1}})
-            return True, "Vote changed successfully!"
-        else:
-            return False, "You have already voted for this city"
-    else:
-        voter_records.insert_one({"user_id": user_id, "city": city_name, "timestamp": datetime.now()})
-        db["cities"].update_one({"name": city_name}, {"$inc": {"votes": 1}})
-        return True, "Vote recorded successfully!"
+    try:
+        previous_vote = _swap_voter_city(voter_records, user_id, city_name)
+    except pymongo.errors.PyMongoError as e:
+        return False, f"Error recording vote: {e}"
+
+    if previous_vote is not None and previous_vote["city"] == city_name:
+        return False, "You have already voted for this city"
+
+    increments = [(city_name, "votes", 1)]
+    if previous_vote is not None:
+        increments.append((previous_vote["city"], "votes", -1))
+    try:
+        _increment_city_counters(db, increments)
+    except pymongo.errors.PyMongoError as e:
+        # The voter record has already moved, so recount the totals from voter_records
+        try:
+            reconciled, _ = reconcile_vote_counts()
+        except pymongo.errors.PyMongoError:
+            reconciled = False
+        if not reconciled:
+            return False, f"Error updating vote counts: {e}"
+
+    if previous_vote is not None:
+        return True, "Vote changed successfully!"
+    return True, "Vote recorded successfully!"
+
+def _swap_voter_city(voter_records, user_id, city_name):
+    """Points the voter's record at city_name and returns the record as it was before, or None for a first vote."""
+    update = {"$set": {"city": city_name, "timestamp": datetime.now()}}
+    try:
+        return voter_records.find_one_and_update(
+            {"user_id": user_id}, update, upsert=True,
+            return_document=pymongo.ReturnDocument.BEFORE
+        )
+    except pymongo.errors.DuplicateKeyError:
+        # A concurrent first vote by the same voter created the record; apply ours on top of it
+        return voter_records.find_one_and_update(
+            {"user_id": user_id}, update,
+            return_document=pymongo.ReturnDocument.BEFORE
+        )
+
+def reconcile_vote_counts():
+    """Recomputes every city's vote count from voter_records, the source of truth."""
+    db = connect_to_mongodb()
+    if db is None:
+        return False, "Database connection error"
+
+    flush_counter_buffer()
+    totals = {item["_id"]: item["count"] for item in db["voter_records"].aggregate([
+        {"$group": {"_id": "$city", "count": {"$sum": 1}}}
+    ])}
+    updates = [
+        pymongo.UpdateOne({"_id": city["_id"]}, {"$set": {"votes": totals.get(city["name"], 0)}})
+        for city in db["cities"].find({}, {"name": 1})
+    ]
+    if updates:
+        db["cities"].bulk_write(updates, ordered=False)
+    invalidate_cache(CITIES_CACHE_KEY)
+    return True, f"Vote counts reconciled for {len(updates)} cities"
 
 def record_registration(name, email, city="Unknown", time_slot="Any Time"):
     """Records a user's registration."""
@@ -321,11 +781,179 @@ def record_registration(name, email, city="Unknown", time_slot="Any Time"):
 
     if result.inserted_id:
         # Update city registration count
-        db["cities"].update_one({"name": city}, {"$inc": {"registrations": 1}})
+        _increment_city_counters(db, [(city, "registrations", 1)])
+        _increment_registration_stats(db, {city: 1}, {time_slot: 1})
         return True, "Registration successful!"
     else:
         return False, "Registration failed"
 
+def _normalize_registration_keys(row):
+    """Strips and lowercases field names so "Name " and "name" are read alike."""
+    return {(key or "").strip().lower(): value for key, value in row.items()}
+
+def parse_registration_file(file_bytes, filename):
+    """
+    Parses an uploaded CSV (with a header row) or JSONL file of volunteers.
+    Returns (rows, rejected) where rows are (line number, dict) pairs with normalized
+    field names, and rejected holds (line number, reason) for lines that could not be parsed.
+    """
+    text = file_bytes.decode("utf-8-sig")
+    rows, rejected = [], []
+    if filename.lower().endswith((".jsonl", ".ndjson")):
+        for line_number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                rejected.append((line_number, f"Invalid JSON: {e}"))
+                continue
+            if not isinstance(row, dict):
+                rejected.append((line_number, "Expected a JSON object"))
+                continue
+            rows.append((line_number, _normalize_registration_keys(row)))
+    else:
+        reader = csv.DictReader(io.StringIO(text))
+        for row in reader:
+            # Header is line 1, so data rows start at line 2
+            rows.append((reader.line_num, _normalize_registration_keys(row)))
+    return rows, rejected
+
+def _validate_registration(row, city_names):
+    """Returns (registration document, None) for a valid row, or (None, reason)."""
+    name = str(row.get("name") or "").strip()
+    email = str(row.get("email") or "").strip()
+    city = str(row.get("city") or "").strip()
+    time_slot = str(row.get("time_slot") or "").strip() or "Any Time"
+
+    if not name or not email or not city:
+        return None, "Missing name, email or city"
+    if "@" not in email or "." not in email:
+        return None, f"Invalid email address '{email}'"
+    if city not in city_names:
+        return None, f"Unknown city '{city}'"
+    if time_slot not in REGISTRATION_TIME_SLOTS:
+        return None, f"Unknown time slot '{time_slot}'"
+
+    return {
+        "name": name,
+        "email": email,
+        "user_id": "bulk_import",
+        "timestamp": datetime.now(),
+        "city": city,
+        "time_slot": time_slot
+    }, None
+
+def iter_registration_batches(batch_size=EXPORT_BATCH_SIZE):
+    """Yields lists of up to batch_size registrations, projected to the export columns."""
+    db = connect_to_mongodb()
+    if db is None:
+        return
+
+    projection = {field: 1 for field in REGISTRATION_EXPORT_FIELDS}
+    projection["_id"] = 0
+    cursor = db["registrations"].find({}, projection).sort("_id", pymongo.ASCENDING).batch_size(batch_size)
+    batch = []
+    for registration in cursor:
+        batch.append(registration)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def iter_registrations_csv(batch_size=EXPORT_BATCH_SIZE):
+    """Yields the registrations as UTF-8 CSV chunks: the header first, then one chunk per batch."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=REGISTRATION_EXPORT_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    yield buffer.getvalue().encode("utf-8")
+    for batch in iter_registration_batches(batch_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+
+def parquet_export_available():
+    """Parquet export needs the optional pyarrow package."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+def write_registrations_parquet(file_obj, batch_size=EXPORT_BATCH_SIZE):
+    """Writes the registrations to a Parquet file, one row group per batch."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(field, pa.string()) for field in REGISTRATION_EXPORT_FIELDS])
+    with pq.ParquetWriter(file_obj, schema) as writer:
+        for batch in iter_registration_batches(batch_size):
+            columns = {field: [registration.get(field) for registration in batch] for field in REGISTRATION_EXPORT_FIELDS}
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+
+def export_registrations_file(export_format="csv", batch_size=EXPORT_BATCH_SIZE):
+    """
+    Returns the registrations export as bytes. The rows are streamed from the database into a
+    temporary file one batch at a time, so only the finished export, which st.download_button
+    keeps in memory anyway, is ever held whole.
+    """
+    fd, path = tempfile.mkstemp(suffix=f".{export_format}")
+    try:
+        with os.fdopen(fd, "wb") as export_file:
+            if export_format == "parquet":
+                write_registrations_parquet(export_file, batch_size)
+            else:
+                for chunk in iter_registrations_csv(batch_size):
+                    export_file.write(chunk)
+        with open(path, "rb") as export_file:
+            return export_file.read()
+    finally:
+        os.remove(path)
+
+def import_registrations(rows, chunk_size=DEFAULT_IMPORT_CHUNK_SIZE):
+    """
+    Bulk-imports volunteer registrations. `rows` is an iterable of dicts or (line number, dict) pairs.
+    Valid rows are inserted with insert_many in chunks, then each city's counter gets one
+    aggregated $inc. Returns {"accepted": count, "rejected": [(line number, reason), ...]}.
+    """
+    db = connect_to_mongodb()
+    if db is None:
+        return {"accepted": 0, "rejected": [(None, "Database connection error")]}
+
+    city_names = {city["name"] for city in get_cities_data()}
+    valid, rejected = [], []
+    for index, row in enumerate(rows, start=1):
+        line_number, row = row if isinstance(row, tuple) else (index, row)
+        document, reason = _validate_registration(row, city_names)
+        if document is None:
+            rejected.append((line_number, reason))
+        else:
+            valid.append((line_number, document))
+
+    registrations = db["registrations"]
+    city_counts = Counter()
+    time_slot_counts = Counter()
+    accepted = 0
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+        failed = {}
+        try:
+            registrations.insert_many([document for _, document in chunk], ordered=False)
+        except pymongo.errors.BulkWriteError as e:
+            failed = {error["index"]: error.get("errmsg", "Insert failed") for error in e.details.get("writeErrors", [])}
+        for index, (line_number, document) in enumerate(chunk):
+            if index in failed:
+                rejected.append((line_number, failed[index]))
+            else:
+                accepted += 1
+                city_counts[document["city"]] += 1
+                time_slot_counts[document["time_slot"]] += 1
+
+    if city_counts:
+        _increment_city_counters(db, [(city, "registrations", count) for city, count in city_counts.items()])
+        _increment_registration_stats(db, city_counts, time_slot_counts)
+
+    rejected.sort(key=lambda item: item[0] or 0)
+    return {"accepted": accepted, "rejected": rejected}
+
 def record_waste_report(report_data, user_id="anonymous_user"):
     """Records a new waste report."""
     db = connect_to_mongodb()
@@ -334,48 +962,108 @@ def record_waste_report(report_data, user_id="anonymous_user"):
 
     report_data["user_id"] = user_id
     report_data["created_at"] = datetime.now()
+    report_data["updated_at"] = report_data["created_at"]
     report_data["upvotes"] = 0
-    report_data["comments"] = []
+    report_data["comment_count"] = 0
 
     waste_reports = db["waste_reports"]
     result = waste_reports.insert_one(report_data)
 
-    return result.inserted_id is not None
+    if result.inserted_id is None:
+        return False
+    _notify_report_change(result.inserted_id, "insert")
+    return True
 
 def upvote_report(report_id, user_id="anonymous_user"):
-    """Increments the upvotes for a waste report."""
+    """
+    Upvotes a waste report once per user. The unique (report_id, user_id) index on report_upvotes
+    admits one upvote per user however many clicks race, and the counter is only incremented
+    for the insert that succeeded. The upvote is removed again if the counter cannot be updated.
+    """
     db = connect_to_mongodb()
     if db is None:
         return False, "Database connection error"
 
-    waste_reports = db["waste_reports"]
-    result = waste_reports.update_one({"_id": ObjectId(report_id)}, {"$inc": {"upvotes": 1}})
+    report_object_id = ObjectId(report_id)
+    upvote = {"report_id": report_object_id, "user_id": user_id, "timestamp": datetime.now()}
+    try:
+        db["report_upvotes"].insert_one(upvote)
+    except pymongo.errors.DuplicateKeyError:
+        return False, "You have already upvoted this report"
+    except pymongo.errors.PyMongoError as e:
+        return False, f"Failed to upvote: {e}"
 
-    if result.modified_count > 0:
-        return True, "Upvoted successfully!"
-    else:
-        return False, "Failed to upvote"
+    try:
+        result = db["waste_reports"].update_one(
+            {"_id": report_object_id},
+            {"$inc": {"upvotes": 1}, "$set": {"updated_at": upvote["timestamp"]}}
+        )
+    except pymongo.errors.PyMongoError as e:
+        db["report_upvotes"].delete_one({"_id": upvote["_id"]})
+        return False, f"Failed to upvote: {e}"
+    if result.matched_count == 0:
+        db["report_upvotes"].delete_one({"_id": upvote["_id"]})
+        return False, "Report not found"
+    _notify_report_change(report_object_id, "update")
+    return True, "Upvoted successfully!"
 
 def add_comment(report_id, comment_text, user_id="anonymous_user"):
-    """Adds a comment to a waste report."""
+    """Adds a comment to the report_comments collection and bumps the report's comment_count."""
     db = connect_to_mongodb()
     if db is None:
         return False, "Database connection error"
 
     comment = {
+        "report_id": ObjectId(report_id),
         "user_id": user_id,
         "text": comment_text,
         "timestamp": datetime.now()
     }
 
     waste_reports = db["waste_reports"]
-    result = waste_reports.update_one({"_id": ObjectId(report_id)}, {"$push": {"comments": comment}})
-
-    if result.modified_count > 0:
-        return True, "Comment added successfully!"
-    else:
+    result = waste_reports.update_one(
+        {"_id": comment["report_id"]},
+        {"$inc": {"comment_count": 1}, "$set": {"updated_at": comment["timestamp"]}}
+    )
+    if result.matched_count == 0:
         return False, "Failed to add comment"
 
+    try:
+        db["report_comments"].insert_one(comment)
+    except pymongo.errors.PyMongoError as e:
+        waste_reports.update_one({"_id": comment["report_id"]}, {"$inc": {"comment_count": -1}})
+        return False, f"Failed to add comment: {e}"
+
+    _notify_report_change(comment["report_id"], "update")
+    return True, "Comment added successfully!"
+
+def get_report_comments(report_id, page_size=COMMENTS_PAGE_SIZE, before=None):
+    """
+    Returns (comments, next_cursor) for one page of a report's comments, newest first.
+    Pass the returned cursor as `before` to fetch the next, older page; it is None on the last page.
+    """
+    db = connect_to_mongodb()
+    if db is None:
+        return [], None
+
+    query = {"report_id": ObjectId(report_id)}
+    if before is not None:
+        last_timestamp, last_id = before
+        query["$or"] = [
+            {"timestamp": {"$lt": last_timestamp}},
+            {"timestamp": last_timestamp, "_id": {"$lt": last_id}}
+        ]
+    comments = list(
+        db["report_comments"].find(query)
+        .sort([("timestamp", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)])
+        .limit(page_size + 1)
+    )
+    next_cursor = None
+    if len(comments) > page_size:
+        comments = comments[:page_size]
+        next_cursor = (comments[-1]["timestamp"], comments[-1]["_id"])
+    return comments, next_cursor
+
 def initialize_cities_data():
     """Initializes the cities data if the collection is empty."""
     db = connect_to_mongodb()
@@ -402,6 +1090,7 @@ def initialize_cities_data():
             {"name": "RR Nagar", "waste_index": 79, "votes": 0, "registrations": 0}
         ]
         cities_collection.insert_many(cities_data)
+        invalidate_cache(CITIES_CACHE_KEY)
 
 def resolve_waste_report(report_id, resolved=True):
     """
@@ -428,10 +1117,11 @@ def resolve_waste_report(report_id, resolved=True):
         # Update the report's resolved status
         result = db["waste_reports"].update_one(
             {"_id": ObjectId(report_id)},
-            {"$set": {"resolved": resolved, "resolved_at": datetime.now()}}
+            {"$set": {"resolved": resolved, "resolved_at": datetime.now(), "updated_at": datetime.now()}}
         )
         
         if result.modified_count > 0:
+            _notify_report_change(ObjectId(report_id), "update")
             status = "resolved" if resolved else "unresolved"
             return True, f"Report marked as {status} successfully"
         else:
@@ -0,0 +1,261 @@
+# Batch EcoSmart analysis: runs many photos through the upload/detect/suggest pipeline
+# concurrently and collects the results into one report.
+#
+#     python ecosmart_batch.py photos/ drive.zip --workers 8 --csv report.csv --json report.json
+#
+# The CLI reads API keys from .streamlit/secrets.toml like the app, so run it from the project root.
+import argparse
+import csv
+import io
+import json
+import os
+import threading
+import time
+import zipfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import streamlit as st
+from ecosmart import get_image_analysis, clean_object_name
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+DEFAULT_BATCH_WORKERS = 8
+# Most calls allowed in flight at once per pipeline stage, to stay under each API's rate limits
+DEFAULT_STAGE_LIMITS = {"upload": 4, "detect": 2, "suggest": 2}
+BATCH_CSV_FIELDS = ["image", "status", "object", "count", "seconds", "error"]
+
+
+class StageLimiter:
+    """Caps how many calls each pipeline stage may have running at once with one semaphore per stage."""
+
+    def __init__(self, limits=None):
+        limits = {**DEFAULT_STAGE_LIMITS, **(limits or {})}
+        self._semaphores = {stage: threading.BoundedSemaphore(limit) for stage, limit in limits.items()}
+
+    def __call__(self, stage_name):
+        return self._semaphores[stage_name]
+
+
+def _is_image_name(name):
+    return name.lower().endswith(IMAGE_EXTENSIONS) and not os.path.basename(name).startswith(".")
+
+
+def _zip_image_entries(archive):
+    return [
+        entry for entry in archive.infolist()
+        if not entry.is_dir() and not entry.filename.startswith("__MACOSX/") and _is_image_name(entry.filename)
+    ]
+
+
+def expand_zip(name, data):
+    """Yields (name, bytes) for every image inside a zip archive."""
+    with zipfile.ZipFile(io.BytesIO(data) if isinstance(data, bytes) else data) as archive:
+        for entry in _zip_image_entries(archive):
+            yield f"{name}/{entry.filename}", archive.read(entry)
+
+
+def iter_uploaded_images(uploaded_files):
+    """Yields (name, bytes) for Streamlit uploads, unpacking any zip archives."""
+    for uploaded_file in uploaded_files:
+        if uploaded_file.name.lower().endswith(".zip"):
+            yield from expand_zip(uploaded_file.name, uploaded_file.getvalue())
+        elif _is_image_name(uploaded_file.name):
+            yield uploaded_file.name, uploaded_file.getvalue()
+
+
+def count_uploaded_images(uploaded_files):
+    """Counts the images iter_uploaded_images will yield, reading only the directories of zip archives."""
+    total = 0
+    for uploaded_file in uploaded_files:
+        if uploaded_file.name.lower().endswith(".zip"):
+            with zipfile.ZipFile(io.BytesIO(uploaded_file.getvalue())) as archive:
+                total += len(_zip_image_entries(archive))
+        elif _is_image_name(uploaded_file.name):
+            total += 1
+    return total
+
+
+def iter_path_images(paths):
+    """Yields (name, bytes) for image files, directories (searched recursively) and zip archives."""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for file_name in sorted(files):
+                    if _is_image_name(file_name):
+                        file_path = os.path.join(root, file_name)
+                        with open(file_path, "rb") as f:
+                            yield file_path, f.read()
+        elif path.lower().endswith(".zip"):
+            yield from expand_zip(path, path)
+        elif _is_image_name(path):
+            with open(path, "rb") as f:
+                yield path, f.read()
+        else:
+            print(f"Skipping {path}: not an image, directory or zip archive")
+
+
+def _analyze_one(name, image_bytes, stage_limit):
+    start = time.perf_counter()
+    result = {"image": name, "status": "ok", "objects": {}, "suggestions": {}, "fallback": False, "error": None}
+    try:
+        analysis = get_image_analysis(image_bytes, stage_limit)
+        result["objects"] = dict(Counter(clean_object_name(obj) for obj in analysis["objects"]))
+        result["suggestions"] = json.loads(analysis["suggestions"])
+        result["fallback"] = analysis["fallback"]
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def run_batch(images, workers=DEFAULT_BATCH_WORKERS, stage_limits=None):
+    """
+    Analyzes (name, bytes) pairs on a pool of `workers` threads and yields one result dict per
+    image as soon as it completes, in completion order. At most twice as many images as there
+    are workers are read ahead, so large directories are not loaded into memory all at once.
+    """
+    stage_limit = StageLimiter(stage_limits)
+    images = iter(images)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ecosmart-batch") as pool:
+        pending = set()
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < workers * 2:
+                try:
+                    name, image_bytes = next(images)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.add(pool.submit(_analyze_one, name, image_bytes, stage_limit))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def summarize_batch(results):
+    """Returns image counts and the total count of every detected object across the batch."""
+    totals = Counter()
+    for result in results:
+        totals.update(result["objects"])
+    return {
+        "images": len(results),
+        "failed": sum(1 for result in results if result["status"] != "ok"),
+        "objects": dict(totals.most_common()),
+    }
+
+
+def batch_results_csv(results):
+    """Returns the results as CSV text with one row per image and detected object."""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=BATCH_CSV_FIELDS)
+    writer.writeheader()
+    for result in results:
+        row = {"image": result["image"], "status": result["status"], "seconds": result["seconds"],
+               "error": result["error"] or ""}
+        if not result["objects"]:
+            writer.writerow({**row, "object": "", "count": 0})
+        for obj, count in result["objects"].items():
+            writer.writerow({**row, "object": obj, "count": count})
+    return output.getvalue()
+
+
+def batch_results_json(results):
+    """Returns the results, including 5R suggestions, and the batch summary as JSON text."""
+    return json.dumps({"summary": summarize_batch(results), "results": results}, indent=2)
+
+
+def display_batch_analysis():
+    """Streamlit view for analyzing many photos, or zip archives of photos, in one run."""
+    uploaded_files = st.file_uploader(
+        "Upload images or zip archives of images",
+        type=["jpg", "jpeg", "png", "zip"],
+        accept_multiple_files=True,
+        help="Photograph every item from a recycling drive and get one report for all of them",
+    )
+    workers = st.slider("Images analyzed in parallel", 1, 16, DEFAULT_BATCH_WORKERS)
+
+    if uploaded_files and st.button("🔍 Analyze all images"):
+        results = []
+        progress = st.progress(0.0, text="Starting batch analysis...")
+        table = st.empty()
+        total = count_uploaded_images(uploaded_files)
+        if not total:
+            st.warning("No jpg, jpeg or png images found in the upload.")
+        for result in run_batch(iter_uploaded_images(uploaded_files), workers=workers):
+            results.append(result)
+            progress.progress(len(results) / total, text=f"Analyzed {len(results)} of {total} images")
+            table.dataframe([
+                {"image": r["image"], "status": r["status"], "objects": ", ".join(r["objects"]) or r["error"],
+                 "seconds": r["seconds"]}
+                for r in results
+            ])
+        progress.empty()
+        st.session_state.ecosmart_batch_results = results
+
+    results = st.session_state.get("ecosmart_batch_results")
+    if not results:
+        return
+
+    summary = summarize_batch(results)
+    st.markdown("### 📦 Batch Summary")
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Images", summary["images"])
+    col2.metric("Failed", summary["failed"])
+    col3.metric("Distinct Objects", len(summary["objects"]))
+    if summary["objects"]:
+        st.bar_chart([{"object": obj, "count": count} for obj, count in summary["objects"].items()],
+                     x="object", y="count")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            label="Download Report (CSV)",
+            data=lambda: batch_results_csv(results),
+            file_name="ecosmart_batch.csv",
+            mime="text/csv",
+            on_click="ignore",
+        )
+    with col2:
+        st.download_button(
+            label="Download Report with Suggestions (JSON)",
+            data=lambda: batch_results_json(results),
+            file_name="ecosmart_batch.json",
+            mime="application/json",
+            on_click="ignore",
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze many images with EcoSmart")
+    parser.add_argument("paths", nargs="+", help="image files, directories of images or zip archives")
+    parser.add_argument("--workers", type=int, default=DEFAULT_BATCH_WORKERS)
+    for stage, limit in DEFAULT_STAGE_LIMITS.items():
+        parser.add_argument(f"--{stage}-limit", type=int, default=limit, help=f"concurrent {stage} calls")
+    parser.add_argument("--csv", help="write the per-object report to this CSV file")
+    parser.add_argument("--json", help="write the full report, with suggestions, to this JSON file")
+    args = parser.parse_args()
+
+    stage_limits = {stage: getattr(args, f"{stage}_limit") for stage in DEFAULT_STAGE_LIMITS}
+    results = []
+    start = time.perf_counter()
+    for result in run_batch(iter_path_images(args.paths), workers=args.workers, stage_limits=stage_limits):
+        results.append(result)
+        detail = ", ".join(f"{obj} x{count}" for obj, count in result["objects"].items()) or result["error"] or "no objects"
+        print(f"[{len(results)}] {result['image']}: {result['status']} in {result['seconds']:.1f}s - {detail}", flush=True)
+
+    summary = summarize_batch(results)
+    print(f"Analyzed {summary['images']} images in {time.perf_counter() - start:.1f}s, {summary['failed']} failed")
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            f.write(batch_results_csv(results))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(batch_results_json(results))
+    raise SystemExit(1 if summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
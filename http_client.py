@@ -0,0 +1,146 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) timeouts in seconds per upstream endpoint
+ENDPOINT_TIMEOUTS = {
+    "imgbb": (5, 30),
+    "rapidapi": (5, 45),
+}
+DEFAULT_TIMEOUT = (5, 30)
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is unbounded
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+
+_sessions = {}
+_histograms = {}
+_lock = threading.Lock()
+
+
+class LatencyHistogram:
+    """Counts call durations into fixed buckets, plus the total, the maximum and the error count."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds, error=False):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            if error:
+                self.errors += 1
+
+    def percentile(self, fraction):
+        """Returns the upper bound of the bucket holding the given fraction of calls, capped at the maximum."""
+        with self._lock:
+            total = sum(self.counts)
+            if total == 0:
+                return None
+            running = 0
+            for index, count in enumerate(self.counts):
+                running += count
+                if running >= fraction * total:
+                    return min(self.buckets[index], self.max_seconds) if index < len(self.buckets) else self.max_seconds
+
+    def summary(self):
+        with self._lock:
+            calls = sum(self.counts)
+            total_seconds = self.total_seconds
+            max_seconds = self.max_seconds
+            errors = self.errors
+        return {
+            "calls": calls,
+            "errors": errors,
+            "mean_seconds": total_seconds / calls if calls else 0.0,
+            "p50_seconds": self.percentile(0.5),
+            "p95_seconds": self.percentile(0.95),
+            "max_seconds": max_seconds,
+        }
+
+
+def _get_histogram(endpoint):
+    with _lock:
+        if endpoint not in _histograms:
+            _histograms[endpoint] = LatencyHistogram()
+        return _histograms[endpoint]
+
+
+def get_session(endpoint):
+    """
+    Returns the keep-alive session for an endpoint, created once per process. Its adapter retries
+    connection errors and 429/5xx responses with exponential backoff, honouring Retry-After.
+    Read timeouts are not retried, so a stalled upstream costs one read timeout rather than four.
+    """
+    with _lock:
+        session = _sessions.get(endpoint)
+        if session is None:
+            retry = Retry(
+                total=DEFAULT_MAX_RETRIES,
+                read=False,
+                backoff_factor=DEFAULT_BACKOFF_FACTOR,
+                status_forcelist=RETRY_STATUS_CODES,
+                # The upload and detection calls are POSTs that are safe to repeat
+                allowed_methods=frozenset({"GET", "POST"}),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=DEFAULT_POOL_SIZE, pool_maxsize=DEFAULT_POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[endpoint] = session
+        return session
+
+
+@contextmanager
+def timed(endpoint):
+    """Records the duration of the enclosed block in the endpoint's latency histogram."""
+    start = time.perf_counter()
+    error = True
+    try:
+        yield
+        error = False
+    finally:
+        _get_histogram(endpoint).record(time.perf_counter() - start, error=error)
+
+
+def request(endpoint, method, url, **kwargs):
+    """
+    Sends a request through the endpoint's pooled session with its default timeout, recording
+    the latency including retries. Responses with status >= 400 are counted as errors.
+    """
+    kwargs.setdefault("timeout", ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT))
+    start = time.perf_counter()
+    response = None
+    try:
+        response = get_session(endpoint).request(method, url, **kwargs)
+        return response
+    finally:
+        error = response is None or response.status_code >= 400
+        _get_histogram(endpoint).record(time.perf_counter() - start, error=error)
+
+
+def post(endpoint, url, **kwargs):
+    return request(endpoint, "POST", url, **kwargs)
+
+
+def get_latency_stats():
+    """Returns {endpoint: summary} for every endpoint called so far."""
+    with _lock:
+        histograms = dict(_histograms)
+    return {endpoint: histogram.summary() for endpoint, histogram in sorted(histograms.items())}
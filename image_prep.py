@@ -0,0 +1,46 @@
+from io import BytesIO
+from PIL import Image, ImageOps
+
+# Longest side, in pixels, sent to the object detector; larger photos do not detect better
+UPLOAD_MAX_DIMENSION = 1024
+UPLOAD_JPEG_QUALITY = 85
+
+
+def prepare_image_for_upload(image_bytes, max_dimension=UPLOAD_MAX_DIMENSION, quality=UPLOAD_JPEG_QUALITY):
+    """
+    Returns JPEG bytes of the photo, upright and with its longest side at most max_dimension.
+
+    JPEGs are decoded at a reduced scale (draft mode) when they are much larger than needed,
+    EXIF orientation is applied, transparency is flattened onto white, and the result is
+    re-encoded. The original bytes are returned when they are already small enough and upright
+    and re-encoding would not make them smaller.
+    """
+    image = Image.open(BytesIO(image_bytes))
+    original_format = image.format
+    original_size = image.size
+    if original_format == "JPEG":
+        # Lets libjpeg decode at 1/2, 1/4 or 1/8 scale, never below the requested size
+        image.draft("RGB", (max_dimension, max_dimension))
+
+    # 0x0112 is the EXIF Orientation tag; 1 means the pixels are already upright
+    rotated = image.getexif().get(0x0112, 1) != 1
+    image = ImageOps.exif_transpose(image)
+
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    elif image.mode != "RGB":
+        image = image.convert("RGB")
+
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+    output = BytesIO()
+    image.save(output, format="JPEG", quality=quality, optimize=True)
+    prepared = output.getvalue()
+
+    unchanged = original_format == "JPEG" and not rotated and max(original_size) <= max_dimension
+    if unchanged and len(image_bytes) <= len(prepared):
+        return image_bytes
+    return prepared
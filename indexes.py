@@ -0,0 +1,212 @@
+import threading
+from datetime import datetime
+import pymongo
+from pymongo.errors import OperationFailure, DuplicateKeyError
+
+# Index definitions: collection -> list of (keys, options)
+EXCHANGE_INDEXES = {
+    "users": [
+        ([("email", pymongo.ASCENDING)], {"name": "email_unique", "unique": True}),
+    ],
+    "seller_listings": [
+        ([("status", pymongo.ASCENDING), ("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)], {"name": "status_created_at"}),
+        ([("status", pymongo.ASCENDING), ("waste_type", pymongo.ASCENDING), ("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)], {"name": "status_waste_type_created_at"}),
+        ([("status", pymongo.ASCENDING), ("price", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)], {"name": "status_price"}),
+        ([("status", pymongo.ASCENDING), ("waste_type", pymongo.ASCENDING), ("price", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)], {"name": "status_waste_type_price"}),
+        ([("user", pymongo.ASCENDING), ("status", pymongo.ASCENDING), ("created_at", pymongo.DESCENDING)], {"name": "user_status_created_at"}),
+        ([("description", pymongo.TEXT), ("location", pymongo.TEXT), ("waste_type", pymongo.TEXT)],
+         {"name": "listing_text", "weights": {"description": 3, "location": 2, "waste_type": 1}}),
+    ],
+    "buyer_requests": [
+        ([("status", pymongo.ASCENDING), ("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)], {"name": "status_created_at"}),
+        ([("status", pymongo.ASCENDING), ("waste_type", pymongo.ASCENDING), ("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)], {"name": "status_waste_type_created_at"}),
+        ([("user", pymongo.ASCENDING), ("status", pymongo.ASCENDING), ("created_at", pymongo.DESCENDING)], {"name": "user_status_created_at"}),
+        ([("requirements", pymongo.TEXT), ("location", pymongo.TEXT), ("waste_type", pymongo.TEXT)],
+         {"name": "request_text", "weights": {"requirements": 3, "location": 2, "waste_type": 1}}),
+    ],
+}
+
+AWARENESS_INDEXES = {
+    "cities": [
+        ([("name", pymongo.ASCENDING)], {"name": "name_unique", "unique": True}),
+    ],
+    "voter_records": [
+        ([("user_id", pymongo.ASCENDING)], {"name": "user_id_unique", "unique": True}),
+        ([("city", pymongo.ASCENDING)], {"name": "city"}),
+    ],
+    "registrations": [
+        ([("city", pymongo.ASCENDING)], {"name": "city"}),
+    ],
+    "waste_reports": [
+        ([("created_at", pymongo.DESCENDING)], {"name": "created_at"}),
+        ([("updated_at", pymongo.ASCENDING)], {"name": "updated_at"}),
+        ([("city", pymongo.ASCENDING), ("created_at", pymongo.DESCENDING)], {"name": "city_created_at"}),
+        ([("city", pymongo.ASCENDING), ("upvotes", pymongo.DESCENDING), ("created_at", pymongo.DESCENDING)], {"name": "city_upvotes_created_at"}),
+        ([("city", pymongo.ASCENDING), ("severity", pymongo.DESCENDING), ("created_at", pymongo.DESCENDING)], {"name": "city_severity_created_at"}),
+        ([("upvotes", pymongo.DESCENDING), ("created_at", pymongo.DESCENDING)], {"name": "upvotes_created_at"}),
+        ([("severity", pymongo.DESCENDING), ("created_at", pymongo.DESCENDING)], {"name": "severity_created_at"}),
+        ([("title", pymongo.TEXT), ("description", pymongo.TEXT), ("location", pymongo.TEXT), ("city", pymongo.TEXT)],
+         {"name": "report_text", "weights": {"title": 5, "description": 3, "location": 2, "city": 2}}),
+    ],
+    "admin_users": [
+        ([("username", pymongo.ASCENDING)], {"name": "username"}),
+    ],
+    "report_comments": [
+        ([("report_id", pymongo.ASCENDING), ("timestamp", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)], {"name": "report_id_timestamp"}),
+    ],
+    "report_upvotes": [
+        ([("report_id", pymongo.ASCENDING), ("user_id", pymongo.ASCENDING)], {"name": "report_id_user_id_unique", "unique": True}),
+    ],
+}
+
+# Query shapes issued by the app: (collection, filter, sort)
+EXCHANGE_QUERY_SHAPES = [
+    ("users", {"email": "probe@example.com"}, None),
+    ("seller_listings", {"status": "Active"}, [("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)]),
+    ("seller_listings", {"status": "Active", "waste_type": "Metal Scraps"}, [("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)]),
+    ("seller_listings", {"status": "Active"}, [("price", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)]),
+    ("seller_listings", {"status": "Active", "waste_type": "Metal Scraps"}, [("price", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)]),
+    ("seller_listings", {"user": "probe", "status": "Active"}, [("created_at", pymongo.DESCENDING)]),
+    ("buyer_requests", {"status": "Active"}, [("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)]),
+    ("buyer_requests", {"status": "Active", "waste_type": "Metal Scraps"}, [("created_at", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)]),
+    ("buyer_requests", {"user": "probe", "status": "Active"}, [("created_at", pymongo.DESCENDING)]),
+    ("seller_listings", {"$text": {"$search": "copper wire"}, "status": "Active"}, None),
+    ("buyer_requests", {"$text": {"$search": "copper wire"}, "status": "Active"}, None),
+]
+
+AWARENESS_QUERY_SHAPES = [
+    ("cities", {"name": "Whitefield"}, None),
+    ("voter_records", {"user_id": "probe"}, None),
+    ("voter_records", {"city": "Whitefield"}, None),
+    ("registrations", {"city": "Whitefield"}, None),
+    ("waste_reports", {}, [("created_at", pymongo.DESCENDING)]),
+    ("waste_reports", {"updated_at": {"$gt": datetime(2024, 1, 1)}}, None),
+    ("waste_reports", {"city": "Whitefield"}, [("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)]),
+    ("waste_reports", {"city": "Whitefield"}, [("upvotes", pymongo.DESCENDING), ("created_at", pymongo.DESCENDING)]),
+    ("waste_reports", {"city": "Whitefield", "severity": 4}, [("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)]),
+    ("waste_reports", {}, [("upvotes", pymongo.DESCENDING), ("created_at", pymongo.DESCENDING)]),
+    ("waste_reports", {"severity": 4}, [("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)]),
+    ("waste_reports", {"$text": {"$search": "garbage Whitefield"}}, None),
+    ("admin_users", {"username": "admin"}, None),
+    ("report_comments", {"report_id": "probe"}, [("timestamp", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)]),
+    ("report_upvotes", {"report_id": "probe", "user_id": "probe"}, None),
+]
+
+# Error codes raised when an index with the same name or keys exists with other options
+_INDEX_CONFLICT_CODES = (85, 86)
+
+_ensured = set()
+_ensured_lock = threading.Lock()
+
+
+def ensure_indexes(db, index_specs):
+    """
+    Creates the given indexes, replacing any existing index whose options changed.
+
+    Returns a list of (collection, index name, status) tuples where status is
+    "ok", "rebuilt" or an error message.
+    """
+    report = []
+    for collection_name, indexes in index_specs.items():
+        collection = db[collection_name]
+        for keys, options in indexes:
+            name = options["name"]
+            try:
+                collection.create_index(keys, **options)
+                report.append((collection_name, name, "ok"))
+            except DuplicateKeyError as e:
+                report.append((collection_name, name, f"duplicate values prevent unique index: {e}"))
+            except OperationFailure as e:
+                if e.code not in _INDEX_CONFLICT_CODES:
+                    report.append((collection_name, name, f"error: {e}"))
+                    continue
+                try:
+                    _drop_conflicting_index(collection, keys, name)
+                    collection.create_index(keys, **options)
+                    report.append((collection_name, name, "rebuilt"))
+                except (DuplicateKeyError, OperationFailure) as rebuild_error:
+                    report.append((collection_name, name, f"error: {rebuild_error}"))
+    return report
+
+
+def _drop_conflicting_index(collection, keys, name):
+    """Drops the existing index that shares the name or key pattern of the one being created."""
+    for existing in collection.list_indexes():
+        if existing["name"] == "_id_":
+            continue
+        if existing["name"] == name or list(existing["key"].items()) == list(keys):
+            collection.drop_index(existing["name"])
+
+
+def ensure_indexes_once(db, index_specs):
+    """Runs ensure_indexes for a database only once per process."""
+    key = (db.name, tuple(sorted(index_specs)))
+    if key in _ensured:
+        return None
+    with _ensured_lock:
+        if key in _ensured:
+            return None
+        try:
+            report = ensure_indexes(db, index_specs)
+        except Exception as e:
+            print(f"Error creating indexes: {e}")
+            return None
+        _ensured.add(key)
+        for collection_name, name, status in report:
+            if status not in ("ok", "rebuilt"):
+                print(f"Index {collection_name}.{name}: {status}")
+        return report
+
+
+def _plan_stages(plan):
+    """Yields every stage name in an explain() plan tree."""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+
+def find_collection_scans(db, query_shapes):
+    """Returns the query shapes whose winning plan still contains a COLLSCAN stage."""
+    scans = []
+    for collection_name, query, sort in query_shapes:
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        winning_plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+        if "COLLSCAN" in set(_plan_stages(winning_plan)):
+            scans.append((collection_name, query, sort))
+    return scans
+
+
+def main():
+    """Creates all indexes and prints which query shapes still scan whole collections."""
+    from database import init_database
+    from database2 import connect_to_mongodb
+
+    targets = [
+        ("waste exchange", init_database(), EXCHANGE_INDEXES, EXCHANGE_QUERY_SHAPES),
+        ("CleanCities", connect_to_mongodb(), AWARENESS_INDEXES, AWARENESS_QUERY_SHAPES),
+    ]
+    for label, db, index_specs, query_shapes in targets:
+        if db is None:
+            print(f"Skipping {label}: database connection failed")
+            continue
+        print(f"== {label} ({db.name}) ==")
+        for collection_name, name, status in ensure_indexes(db, index_specs):
+            print(f"  {collection_name}.{name}: {status}")
+        scans = find_collection_scans(db, query_shapes)
+        if scans:
+            print("  Query shapes still using a collection scan:")
+            for collection_name, query, sort in scans:
+                print(f"    {collection_name} filter={query} sort={sort}")
+        else:
+            print("  All query shapes use an index.")
+
+
+if __name__ == "__main__":
+    main()
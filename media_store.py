@@ -0,0 +1,122 @@
+import hashlib
+import os
+import tempfile
+import threading
+from io import BytesIO
+from PIL import Image, ImageOps
+import gridfs
+from pymongo.errors import DuplicateKeyError
+
+THUMBNAIL_SIZE = (320, 240)
+THUMBNAIL_SUFFIX = "_thumb"
+DEFAULT_MEDIA_ROOT = "media"
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class LocalMediaBackend:
+    """Stores blobs as files under a root directory, sharded by the first two characters of the key."""
+
+    def __init__(self, root=DEFAULT_MEDIA_ROOT):
+        self.root = root
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def put(self, key, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+
+class GridFSMediaBackend:
+    """Stores blobs in a GridFS bucket, using the key as the file _id."""
+
+    def __init__(self, db, bucket_name="media"):
+        self.bucket = gridfs.GridFSBucket(db, bucket_name=bucket_name)
+        self.files = db[f"{bucket_name}.files"]
+
+    def exists(self, key):
+        return self.files.find_one({"_id": key}, {"_id": 1}) is not None
+
+    def put(self, key, data):
+        try:
+            self.bucket.upload_from_stream_with_id(key, key, data)
+        except (DuplicateKeyError, gridfs.errors.FileExists):
+            # Another request stored the same content first
+            pass
+
+    def get(self, key):
+        try:
+            return self.bucket.open_download_stream(key).read()
+        except gridfs.errors.NoFile:
+            return None
+
+
+def make_thumbnail(image_bytes, size=THUMBNAIL_SIZE):
+    """Returns JPEG bytes of the image cropped and scaled to exactly `size`."""
+    image = ImageOps.exif_transpose(Image.open(BytesIO(image_bytes)))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    thumbnail = ImageOps.fit(image, size)
+    buffered = BytesIO()
+    thumbnail.save(buffered, format="JPEG", quality=80)
+    return buffered.getvalue()
+
+
+class MediaStore:
+    """Content-addressed image store that keeps each original once, plus a fixed-size thumbnail."""
+
+    def __init__(self, backend, thumbnail_size=THUMBNAIL_SIZE):
+        self.backend = backend
+        self.thumbnail_size = thumbnail_size
+
+    def save_image(self, image_bytes):
+        """Stores the image and its thumbnail under the SHA-256 of the bytes and returns that id."""
+        image_id = hashlib.sha256(image_bytes).hexdigest()
+        if not self.backend.exists(image_id):
+            self.backend.put(image_id, image_bytes)
+        thumbnail_key = image_id + THUMBNAIL_SUFFIX
+        if not self.backend.exists(thumbnail_key):
+            self.backend.put(thumbnail_key, make_thumbnail(image_bytes, self.thumbnail_size))
+        return image_id
+
+    def get_original(self, image_id):
+        return self.backend.get(image_id)
+
+    def get_thumbnail(self, image_id):
+        return self.backend.get(image_id + THUMBNAIL_SUFFIX)
+
+
+def get_media_store(db):
+    """
+    Returns the media store for a database, built once per process.
+    MEDIA_BACKEND selects "gridfs" (default) or "local"; MEDIA_ROOT sets the local directory.
+    """
+    key = db.name
+    store = _stores.get(key)
+    if store is not None:
+        return store
+    with _stores_lock:
+        if key not in _stores:
+            if os.environ.get("MEDIA_BACKEND", "gridfs").lower() == "local":
+                backend = LocalMediaBackend(os.environ.get("MEDIA_ROOT", DEFAULT_MEDIA_ROOT))
+            else:
+                backend = GridFSMediaBackend(db)
+            _stores[key] = MediaStore(backend)
+        return _stores[key]
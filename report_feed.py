@@ -0,0 +1,252 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+import pymongo
+from database2 import (
+    connect_to_mongodb,
+    add_report_change_listener,
+    get_report_images,
+    REPORT_SUMMARY_PROJECTION,
+)
+
+DEFAULT_POLL_INTERVAL_SECONDS = 2
+MAX_TRACKED_CHANGES = 10000
+
+# Error code returned when change streams are unavailable (standalone mongod)
+_CHANGE_STREAM_UNSUPPORTED_CODES = (40573,)
+
+_feed = None
+_feed_lock = threading.Lock()
+
+
+class ReportChangeFeed:
+    """
+    Process-wide log of changed waste report ids.
+
+    A background thread tails a change stream on waste_reports. On a standalone server,
+    where change streams are unavailable, it polls for reports with a newer updated_at
+    instead. To exercise the change stream path locally, start a single-node replica set
+    (`mongod --replSet rs0`, then `rs.initiate()` in mongosh) and set MONGODB_URI to it.
+    Writes made through database2 are also recorded immediately via a change listener.
+    """
+
+    def __init__(self, poll_interval=DEFAULT_POLL_INTERVAL_SECONDS, max_changes=MAX_TRACKED_CHANGES):
+        self.poll_interval = poll_interval
+        self.mode = "starting"
+        self._changes = deque(maxlen=max_changes)
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._resume_token = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="report-feed", daemon=True)
+            self._thread.start()
+
+    @property
+    def sequence(self):
+        return self._sequence
+
+    def record_change(self, report_id, operation):
+        """Appends a change to the log; called by the watcher threads and the database2 listener."""
+        with self._lock:
+            self._sequence += 1
+            self._changes.append((self._sequence, report_id, operation))
+
+    def changes_since(self, sequence):
+        """
+        Returns (latest sequence, {report id: operation}) for the changes since `sequence`, or
+        (latest sequence, None) when the log no longer reaches back that far. A report that was
+        both inserted and updated is reported as "insert"; a deletion overrides both.
+        """
+        with self._lock:
+            latest = self._sequence
+            if sequence == latest:
+                return latest, {}
+            if not self._changes or self._changes[0][0] > sequence + 1:
+                return latest, None
+            changes = {}
+            for seq, report_id, operation in self._changes:
+                if seq <= sequence:
+                    continue
+                if operation == "delete" or changes.get(report_id) not in ("insert", "delete"):
+                    changes[report_id] = operation
+            return latest, changes
+
+    def _run(self):
+        while True:
+            try:
+                self._watch_change_stream()
+            except pymongo.errors.OperationFailure as e:
+                if e.code in _CHANGE_STREAM_UNSUPPORTED_CODES:
+                    self._poll_updates()
+                    return
+                print(f"Report change stream failed, retrying: {e}")
+            except pymongo.errors.PyMongoError as e:
+                print(f"Report change stream failed, retrying: {e}")
+            time.sleep(self.poll_interval)
+
+    def _watch_change_stream(self):
+        db = connect_to_mongodb()
+        if db is None:
+            return
+        with db["waste_reports"].watch(resume_after=self._resume_token) as stream:
+            self.mode = "change_stream"
+            for change in stream:
+                self._resume_token = stream.resume_token
+                document_key = change.get("documentKey")
+                if document_key is None:
+                    continue
+                self.record_change(document_key["_id"], change["operationType"])
+
+    def _poll_updates(self):
+        # MongoDB stores datetimes to the millisecond; start a millisecond back so reports written
+        # in the same millisecond as the poller started still compare as newer
+        now = datetime.now()
+        last_seen = now.replace(microsecond=now.microsecond // 1000 * 1000) - timedelta(milliseconds=1)
+        self.mode = "polling"
+        while True:
+            time.sleep(self.poll_interval)
+            db = connect_to_mongodb()
+            if db is None:
+                continue
+            try:
+                changed = list(db["waste_reports"].find(
+                    {"updated_at": {"$gt": last_seen}}, {"_id": 1, "created_at": 1, "updated_at": 1}
+                ))
+            except pymongo.errors.PyMongoError as e:
+                print(f"Report polling failed: {e}")
+                continue
+            # Deletions leave nothing to poll for; only the in-process listener records those
+            window_start = last_seen
+            for report in changed:
+                last_seen = max(last_seen, report["updated_at"])
+                created_at = report.get("created_at")
+                operation = "insert" if created_at is not None and created_at > window_start else "update"
+                self.record_change(report["_id"], operation)
+
+
+class SessionReportCache:
+    """
+    Per-session copy of the report list currently on screen, kept current by re-reading only the
+    displayed reports that the feed reports as changed.
+    """
+
+    def __init__(self):
+        self.reports = {}
+        self.sequence = None
+        self.list_key = None
+        self.query = None
+        self.total = 0
+        self._legacy_images = {}
+        self._refreshed_locally = set()
+
+    def refresh(self, feed):
+        """
+        Applies the feed's changes to the cached reports and returns True when the list itself has
+        to be queried again: on first use, when the feed log no longer reaches back far enough, after
+        a deletion, when a displayed report stopped matching the list's filter, or when a report not
+        on screen now matches it (a new report, or an updated one while every match is shown).
+        Changes that only touch displayed reports are re-read into the cache and return False.
+        """
+        latest, changes = feed.changes_since(self.sequence) if self.sequence is not None else (feed.sequence, None)
+        refreshed_locally, self._refreshed_locally = self._refreshed_locally, set()
+        self.sequence = latest
+        if changes is None:
+            self.reports = {}
+            self._legacy_images = {}
+            self.list_key = None
+            return True
+
+        # This session's own card actions were already re-read by refresh_report()
+        changes = {report_id: operation for report_id, operation in changes.items() if report_id not in refreshed_locally}
+        if not changes:
+            return False
+        if "delete" in changes.values() or self.query is None:
+            return True
+
+        displayed_changes = changes.keys() & self.reports.keys()
+        if displayed_changes:
+            self._apply(displayed_changes)
+        matching = self._matching_ids(changes.keys())
+        if any(report_id not in matching for report_id in displayed_changes):
+            return True
+        hidden_matches = matching - self.reports.keys()
+        if any(changes[report_id] == "insert" for report_id in hidden_matches):
+            return True
+        # An update can move a hidden report into a truncated list only by sorting ahead of the
+        # last one shown; those are picked up on the next full query rather than polled for
+        return bool(hidden_matches) and self.total <= len(self.reports)
+
+    def set_reports(self, reports, query=None, total=None, list_key=None):
+        """
+        Replaces the cached reports with the list currently being displayed. `query` is the filter
+        the list was read with, `total` the number of reports matching it, and `list_key` identifies
+        the filters, sort and limit so the list is only queried again when they change.
+        """
+        self.reports = {report["_id"]: report for report in reports}
+        self.query = query
+        self.total = len(self.reports) if total is None else total
+        self.list_key = list_key
+        self._legacy_images = {
+            report_id: image for report_id, image in self._legacy_images.items() if report_id in self.reports
+        }
+
+    def refresh_report(self, report_id):
+        """Re-reads a single report, e.g. right after this session changed it."""
+        self._refreshed_locally.add(report_id)
+        self._apply({report_id})
+
+    def get(self, report_id):
+        return self.reports.get(report_id)
+
+    def values(self):
+        return list(self.reports.values())
+
+    def legacy_images(self, report_ids):
+        """Returns inline images of legacy reports, fetching only those not already cached."""
+        missing = [report_id for report_id in report_ids if report_id not in self._legacy_images]
+        if missing:
+            images = get_report_images(missing)
+            # Cache misses as None too, so reports without an image are not queried again
+            self._legacy_images.update({report_id: images.get(report_id) for report_id in missing})
+        return {report_id: self._legacy_images.get(report_id) for report_id in report_ids}
+
+    def _matching_ids(self, report_ids):
+        """Returns the subset of report_ids whose current documents match the list's filter."""
+        db = connect_to_mongodb()
+        if db is None:
+            return set()
+        query = dict(self.query, _id={"$in": list(report_ids)})
+        return {report["_id"] for report in db["waste_reports"].find(query, {"_id": 1})}
+
+    def _apply(self, report_ids):
+        db = connect_to_mongodb()
+        if db is None:
+            return
+        report_ids = list(report_ids)
+        found = {
+            report["_id"]: report
+            for report in db["waste_reports"].find({"_id": {"$in": report_ids}}, REPORT_SUMMARY_PROJECTION)
+        }
+        for report_id in report_ids:
+            self._legacy_images.pop(report_id, None)
+            if report_id in found:
+                self.reports[report_id] = found[report_id]
+            else:
+                self.reports.pop(report_id, None)
+
+
+def get_report_feed():
+    """Returns the process-wide report feed, starting its watcher thread on first use."""
+    global _feed
+    if _feed is None:
+        with _feed_lock:
+            if _feed is None:
+                feed = ReportChangeFeed()
+                add_report_change_listener(feed.record_change)
+                feed.start()
+                _feed = feed
+    return _feed
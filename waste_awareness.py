@@ -12,34 +12,114 @@ import json
 from styles import main_css, admin_css, public_reports_css
 
 # Import database operations
+from bootstrap import bootstrap_once
+from report_feed import get_report_feed, SessionReportCache
 from database2 import (
-    connect_to_mongodb,
-    initialize_admin_accounts,
     verify_admin,
     change_admin_password,
     update_campaign_dates,
     get_campaign_dates,
     reset_campaign,
+    reconcile_vote_counts,
     add_new_city,
     update_city_waste_index,
     delete_city,
     get_registration_stats,
     delete_waste_report,
     tag_bbmp_waste_report,
-    get_waste_reports,
+    build_report_query,
+    find_waste_reports,
+    count_waste_reports,
+    search_waste_reports,
+    get_report_cities,
+    get_report_images,
+    get_report_comments,
+    get_media_store,
     get_cities_data,
     record_vote,
     record_registration,
     record_waste_report,
     upvote_report,
     add_comment,
-    initialize_cities_data,
     resolve_waste_report,
+    parse_registration_file,
+    import_registrations,
+    export_registrations_file,
+    parquet_export_available,
+    REGISTRATION_TIME_SLOTS,
+    REPORT_STATUS_FILTERS,
+    REPORT_SORT_OPTIONS,
+    DEFAULT_REPORT_LIMIT,
 )
 
+# How often the public reports page checks for reports changed by other sessions
+REPORT_FEED_REFRESH_SECONDS = 5
 
 
 
+
+def display_report_image(report, legacy_images, width, key):
+    """Shows a report's stored thumbnail, with the original loaded only on demand; falls back to legacy inline images."""
+    if report.get('image_id'):
+        store = get_media_store()
+        thumbnail = store.get_thumbnail(report['image_id']) if store else None
+        if thumbnail is None:
+            st.error("Error displaying image: image not found")
+            return
+        st.image(thumbnail, width=width)
+        if st.toggle("View full image", key=key):
+            original = store.get_original(report['image_id'])
+            if original:
+                st.image(original, use_container_width=True)
+    elif legacy_images.get(report['_id']):
+        try:
+            image_data = base64.b64decode(legacy_images[report['_id']])
+            image = Image.open(BytesIO(image_data))
+            st.image(image, width=width)
+        except Exception as e:
+            st.error(f"Error displaying image: {e}")
+
+
+def _load_more_comments(report_id, state_key):
+    state = st.session_state[state_key]
+    comments, state["cursor"] = get_report_comments(report_id, before=state["cursor"])
+    state["comments"].extend(comments)
+
+
+def display_report_comments(report, state_key, render_comment):
+    """Shows a report's comment count and loads its comments a page at a time, only once opened."""
+    comment_count = report.get('comment_count', 0)
+    if not comment_count:
+        return
+    if not st.toggle(f"View {comment_count} Comments", key=f"{state_key}_toggle"):
+        st.session_state.pop(state_key, None)
+        return
+    if state_key not in st.session_state:
+        st.session_state[state_key] = {"comments": [], "cursor": None}
+        _load_more_comments(report['_id'], state_key)
+
+    state = st.session_state[state_key]
+    for i, comment in enumerate(state["comments"]):
+        render_comment(i, comment)
+    if state["cursor"] is not None:
+        st.button("Load older comments", key=f"{state_key}_more", on_click=_load_more_comments, args=(report['_id'], state_key))
+
+
+def report_limit_control(state_key, signature):
+    """Returns how many reports to show, starting again from DEFAULT_REPORT_LIMIT whenever the filters change."""
+    if st.session_state.get(f"{state_key}_signature") != signature:
+        st.session_state[f"{state_key}_signature"] = signature
+        st.session_state[state_key] = DEFAULT_REPORT_LIMIT
+    return st.session_state[state_key]
+
+
+def show_more_reports_button(state_key, shown, total):
+    """Raises the report limit by another page while more reports match the filters."""
+    if shown < total and st.button(f"Show more reports ({total - shown} remaining)", key=f"{state_key}_more"):
+        st.session_state[state_key] += DEFAULT_REPORT_LIMIT
+        st.rerun()
+
+
 def display_admin_login():
     """Handle admin login form"""
     with st.form("admin_login"):
@@ -113,6 +193,16 @@ def display_admin_dashboard():
         except Exception as e:
             st.error(f"Error resetting campaign: {e}")
 
+    if st.button("Reconcile Vote Counts"):
+        try:
+            success, message = reconcile_vote_counts()
+            if success:
+                st.success(message)
+            else:
+                st.error(message)
+        except Exception as e:
+            st.error(f"Error reconciling vote counts: {e}")
+
 
 def display_manage_cities():
     """Display interface for adding, updating, and deleting cities"""
@@ -196,18 +286,22 @@ def display_registration_stats():
                 fig_time_slot = px.pie(df_by_time_slot, names="Time Slot", values="Registrations", title="Registrations per Time Slot")
                 st.plotly_chart(fig_time_slot)
 
-            # Download Raw Data
+            # Download Raw Data; the export is only streamed to a temporary file when a button is clicked
             try:
-                registrations_data = connect_to_mongodb()["registrations"].find()
-                registrations_df = pd.DataFrame(list(registrations_data))
-                if not registrations_df.empty:
-                    registrations_df = registrations_df.drop(columns=['_id', 'user_id', 'timestamp'], errors='ignore')
-                    csv = registrations_df.to_csv(index=False).encode('utf-8')
+                st.download_button(
+                    label="Download Raw Registrations Data (CSV)",
+                    data=lambda: export_registrations_file("csv"),
+                    file_name="registrations.csv",
+                    mime="text/csv",
+                    on_click="ignore",
+                )
+                if parquet_export_available():
                     st.download_button(
-                        label="Download Raw Registrations Data (CSV)",
-                        data=csv,
-                        file_name="registrations.csv",
-                        mime="text/csv",
+                        label="Download Raw Registrations Data (Parquet)",
+                        data=lambda: export_registrations_file("parquet"),
+                        file_name="registrations.parquet",
+                        mime="application/vnd.apache.parquet",
+                        on_click="ignore",
                     )
             except Exception as e:
                 st.error(f"Error preparing download data: {e}")
@@ -217,19 +311,44 @@ def display_registration_stats():
         st.error(f"Error retrieving registration statistics: {e}")
 
 
+def display_registration_import():
+    """Display the bulk volunteer import from a CSV or JSONL file"""
+    st.subheader("Import Volunteers")
+    st.markdown("Upload a CSV with a header row, or a JSONL file, with the columns `name`, `email`, `city` and optionally `time_slot`.")
+    
+    with st.form("registration_import_form", clear_on_submit=True):
+        upload = st.file_uploader("Volunteer file", type=["csv", "jsonl", "ndjson"])
+        submitted = st.form_submit_button("Import")
+        if submitted and upload is not None:
+            try:
+                rows, rejected = parse_registration_file(upload.getvalue(), upload.name)
+                with st.spinner(f"Importing {len(rows)} rows..."):
+                    summary = import_registrations(rows)
+                rejected = sorted(rejected + summary["rejected"], key=lambda item: item[0] or 0)
+                
+                st.success(f"Imported {summary['accepted']} volunteers.")
+                if rejected:
+                    st.warning(f"{len(rejected)} rows were rejected.")
+                    st.dataframe(pd.DataFrame(rejected, columns=["Line", "Reason"]))
+            except UnicodeDecodeError:
+                st.error("The file must be UTF-8 encoded.")
+            except Exception as e:
+                st.error(f"Error importing volunteers: {e}")
+
+
 def display_waste_reports_management():
     """Display interface for managing waste reports"""
     st.subheader("Waste Reports Management")
     
     try:
-        reports = get_waste_reports()
-        if not reports or len(reports) == 0:
+        report_cities = get_report_cities()
+        if not report_cities:
             st.info("No waste reports submitted yet.")
             return
 
         # Filter controls
-        cities = ["All Cities"] + list(set(report["city"] for report in reports))
-        statuses = ["All", "Pending", "Tagged BBMP", "Resolved"]
+        cities = ["All Cities"] + report_cities
+        statuses = ["All"] + list(REPORT_STATUS_FILTERS)
         severities = ["All", 1, 2, 3, 4, 5]
 
         col1, col2, col3 = st.columns(3)
@@ -240,21 +359,20 @@ def display_waste_reports_management():
         with col3:
             filter_severity = st.selectbox("Filter by Severity", severities)
 
-        # Apply filters
-        filtered_reports = reports
-        if filter_city != "All Cities":
-            filtered_reports = [r for r in filtered_reports if r["city"] == filter_city]
-        if filter_status != "All":
-            if filter_status == "Pending":
-                filtered_reports = [r for r in filtered_reports if not r.get("tag_bbmp", False) and not r.get("resolved", False)]
-            elif filter_status == "Tagged BBMP":
-                filtered_reports = [r for r in filtered_reports if r.get("tag_bbmp", False)]
-            elif filter_status == "Resolved":
-                filtered_reports = [r for r in filtered_reports if r.get("resolved", False)]
-        if filter_severity != "All":
-            filtered_reports = [r for r in filtered_reports if r.get("severity", 3) == filter_severity]
-
-        st.markdown(f"**{len(filtered_reports)}** reports found.")
+        # Filter and limit on the server
+        query = build_report_query(
+            city=None if filter_city == "All Cities" else filter_city,
+            status=None if filter_status == "All" else filter_status,
+            severity=None if filter_severity == "All" else filter_severity,
+        )
+        total = count_waste_reports(query)
+        limit = report_limit_control("admin_report_limit", (filter_city, filter_status, filter_severity))
+        filtered_reports = find_waste_reports(query, limit=limit)
+
+        st.markdown(f"**{total}** reports found.")
+
+        # Load inline images only for the legacy reports being displayed
+        images = get_report_images([report['_id'] for report in filtered_reports if not report.get('image_id')])
 
         # Display reports
         for report in filtered_reports:
@@ -263,19 +381,13 @@ def display_waste_reports_management():
                 col1, col2 = st.columns([3, 1])
                 with col1:
                     st.markdown(f"Location: {report['city']} - {report['location']}")
-                    st.markdown(f"Severity: {report.get('severity', 3)}/5 | Upvotes: {report.get('upvotes', 0)} | Comments: {len(report.get('comments', []))}")
+                    st.markdown(f"Severity: {report.get('severity', 3)}/5 | Upvotes: {report.get('upvotes', 0)} | Comments: {report.get('comment_count', 0)}")
                     st.markdown(f"Reported on: {report.get('created_at', datetime.now()).strftime('%Y-%m-%d %H:%M:%S')}")
                     short_description = report['description'][:100] + "..." if len(report['description']) > 100 else report['description']
                     st.markdown(short_description)
                     
                     # Display image if available
-                    if 'image' in report and report['image']:
-                        try:
-                            image_data = base64.b64decode(report['image'])
-                            image = Image.open(BytesIO(image_data))
-                            st.image(image, width=200)
-                        except Exception as e:
-                            st.error(f"Error displaying image: {e}")
+                    display_report_image(report, images, 200, f"admin_full_img_{report['_id']}")
                 
                 with col2:
                     report_id = str(report['_id'])
@@ -311,14 +423,16 @@ def display_waste_reports_management():
                     st.markdown("</div>", unsafe_allow_html=True)
                 
                 # Comments section
-                if report.get('comments', []):
-                    with st.expander(f"View {len(report.get('comments', []))} Comments"):
-                        for i, comment in enumerate(report.get('comments', [])):
-                            st.markdown(f"**Comment {i+1}** - {comment.get('timestamp', datetime.now()).strftime('%Y-%m-%d %H:%M:%S')}")
-                            st.markdown(f"_{comment.get('text', '')}_")
-                            st.markdown("---")
+                def render_admin_comment(i, comment):
+                    st.markdown(f"**Comment {i+1}** - {comment.get('timestamp', datetime.now()).strftime('%Y-%m-%d %H:%M:%S')}")
+                    st.markdown(f"_{comment.get('text', '')}_")
+                    st.markdown("---")
+
+                display_report_comments(report, f"admin_comments_{report['_id']}", render_admin_comment)
                 
                 st.markdown("<hr>", unsafe_allow_html=True)
+
+        show_more_reports_button("admin_report_limit", len(filtered_reports), total)
     except Exception as e:
         st.error(f"Error in waste reports management: {e}")
 
@@ -372,6 +486,7 @@ def admin_section():
             "📊 Dashboard", 
             "🏙️ Manage Cities", 
             "📈 Registration Stats",
+            "📥 Import Volunteers",
             "🗑️ Waste Reports",
             "🔐 Settings"
         ])
@@ -386,9 +501,12 @@ def admin_section():
             display_registration_stats()
             
         with admin_tabs[3]:
-            display_waste_reports_management()
+            display_registration_import()
             
         with admin_tabs[4]:
+            display_waste_reports_management()
+            
+        with admin_tabs[5]:
             handle_password_change()
 
 
@@ -486,6 +604,148 @@ import streamlit as st
 import base64
 from io import BytesIO
 from datetime import datetime
+def get_session_report_cache():
+    """Returns this session's report cache, creating it on first use."""
+    if "report_cache" not in st.session_state:
+        st.session_state.report_cache = SessionReportCache()
+    return st.session_state.report_cache
+
+
+@st.fragment(run_every=REPORT_FEED_REFRESH_SECONDS)
+def display_public_report_list(query, sort_by, search, limit):
+    """
+    Renders the public report list and re-renders it every few seconds from the session cache.
+    Reports changed elsewhere are re-read one by one; the list is queried again only when the
+    filters change or the feed shows a change that alters which reports it holds.
+    """
+    cache = get_session_report_cache()
+    list_key = (repr(query), sort_by, search, limit)
+    if cache.refresh(get_report_feed()) or cache.list_key != list_key:
+        if search:
+            # Search results are ranked by relevance instead of the chosen sort
+            list_query = dict(query, **{"$text": {"$search": search}})
+            reports, _ = search_waste_reports(search, query, page_size=limit)
+        else:
+            list_query = query
+            reports = find_waste_reports(query, sort=REPORT_SORT_OPTIONS[sort_by], limit=limit)
+        cache.set_reports(reports, query=list_query, total=count_waste_reports(list_query), list_key=list_key)
+    filtered_reports = cache.values()
+
+    # Show report count with better formatting
+    st.markdown(f"<h3 class='section-header'>📋 Showing {len(filtered_reports)} of {cache.total} waste reports</h3>", unsafe_allow_html=True)
+
+    # Load inline images only for the legacy reports being displayed, once per session
+    images = cache.legacy_images([report['_id'] for report in filtered_reports if not report.get('image_id')])
+
+    # Display reports with improved UI; each card is a fragment so actions re-render only that card
+    for report in filtered_reports:
+        display_public_report_card(report['_id'], images.get(report['_id']))
+
+    show_more_reports_button("public_report_limit", len(filtered_reports), cache.total)
+
+
+@st.fragment
+def display_public_report_card(report_object_id, legacy_image=None):
+    """Renders one public report card from the session cache."""
+    cache = get_session_report_cache()
+    report = cache.get(report_object_id)
+    if report is None:
+        return
+    report_id = str(report_object_id)
+
+    with st.container():
+        st.markdown(f'<div class="report-card">', unsafe_allow_html=True)
+        
+        # Report header
+        st.markdown(f'<div class="report-title">{report["title"]}</div>', unsafe_allow_html=True)
+        st.markdown(f'<div class="report-location">📍 {report["city"]} - {report["location"]}</div>', unsafe_allow_html=True)
+        
+        # Status tags
+        tags_html = '<div style="margin-bottom: 10px;">'
+        if report.get('tag_bbmp', False) and not report.get('resolved', False):
+            tags_html += '<span class="tag bbmp-tag">BBMP Tagged</span>'
+        elif report.get('resolved', False):
+            tags_html += '<span class="tag resolved-tag">Resolved</span>'
+        else:
+            tags_html += '<span class="tag pending-tag">Pending</span>'
+        tags_html += '</div>'
+        st.markdown(tags_html, unsafe_allow_html=True)
+        
+        # Report metadata
+        severity = report.get('severity', 3)
+        severity_color = {
+            1: "#c9e3c3",
+            2: "#a5d28d",
+            3: "#ffeb99", 
+            4: "#ffa07a",
+            5: "#ff6961"
+        }.get(severity, "#ffeb99")
+        
+        st.markdown(f"""
+        <div class="report-metadata">
+            <span class="severity-indicator">
+                Severity: 
+                <span class="severity-dot" style="background-color: {severity_color};"></span>
+                {severity}/5
+            </span>
+            <span>👍 {report.get('upvotes', 0)} Upvotes</span>
+            <span>💬 {report.get('comment_count', 0)} Comments</span>
+            <span>📅 Reported: {report.get('created_at', datetime.now()).strftime('%Y-%m-%d')}</span>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        # Description
+        st.markdown(f"""
+        <div class="report-description">
+            {report['description']}
+        </div>
+        """, unsafe_allow_html=True)
+        
+        # Display image if available
+        display_report_image(report, {report['_id']: legacy_image}, 300, f"full_img_{report_id}")
+        
+        # Upvote and Comment Actions
+        col1, col2 = st.columns([1, 3])
+        
+        with col1:
+            upvote_btn = st.button(f"👍 Upvote ({report.get('upvotes', 0)})", key=f"upvote_{report_id}")
+            if upvote_btn:
+                success, message = upvote_report(report_id, st.session_state.user_id)
+                if success:
+                    cache.refresh_report(report['_id'])
+                    st.rerun(scope="fragment")
+                else:
+                    st.error(message)
+        
+        with col2:
+            with st.expander("💬 Add a comment"):
+                with st.form(key=f"comment_form_{report_id}"):
+                    comment_text = st.text_area("Your comment", key=f"comment_text_{report_id}")
+                    submit_comment = st.form_submit_button("Post Comment")
+                    if submit_comment and comment_text:
+                        success, message = add_comment(report_id, comment_text, st.session_state.user_id)
+                        if success:
+                            cache.refresh_report(report['_id'])
+                            # Reload the comments from the first page so the new one shows up
+                            st.session_state.pop(f"comments_{report_id}", None)
+                            st.rerun(scope="fragment")
+                        else:
+                            st.error(message)
+        
+        # Display comments
+        def render_public_comment(i, comment):
+            st.markdown(f"""
+            <div class="comment-box">
+                <strong>Anonymous</strong> · {comment.get('timestamp', datetime.now()).strftime('%Y-%m-%d %H:%M')}
+                <p>{comment.get('text', '')}</p>
+            </div>
+            """, unsafe_allow_html=True)
+
+        display_report_comments(report, f"comments_{report_id}", render_public_comment)
+        
+        st.markdown('</div>', unsafe_allow_html=True)
+
+
 def display_waste_reports_public():
     """Display waste reports for public view with improved UI"""
     
@@ -592,17 +852,17 @@ def display_waste_reports_public():
         </style>
         """, unsafe_allow_html=True)
         
-        # Get all reports
-        reports = get_waste_reports()
-        if not reports:
+        report_cities = get_report_cities()
+        if not report_cities:
             st.info("No waste reports have been submitted yet.")
             return
 
-        # Extract cities for filter
-        cities = ["All Cities"] + sorted(list(set(report["city"] for report in reports)))
+        # Cities for the filter
+        cities = ["All Cities"] + report_cities
 
         # Filters in a nicer container
         st.markdown("### 🔍 Filter Reports")
+        search = st.text_input("Search reports", placeholder="e.g. garbage dump near Whitefield", key="public_report_search").strip()
         with st.container():
             st.markdown('<div class="filter-container">', unsafe_allow_html=True)
             col1, col2, col3 = st.columns([1, 1, 1])
@@ -611,138 +871,20 @@ def display_waste_reports_public():
                 filter_city = st.selectbox("City", cities, key="public_city_filter")
             
             with col2:
-                filter_status = st.selectbox("Status", ["All", "Pending", "Tagged for BBMP", "Resolved"], key="public_status_filter")
+                filter_status = st.selectbox("Status", ["All"] + list(REPORT_STATUS_FILTERS), key="public_status_filter")
             
             with col3:
-                sort_by = st.selectbox("Sort By", ["Newest First", "Oldest First", "Most Upvotes", "Severity (High to Low)"])
+                sort_by = st.selectbox("Sort By", list(REPORT_SORT_OPTIONS))
             
             st.markdown('</div>', unsafe_allow_html=True)
 
-        # Apply filters
-        filtered_reports = reports
-        if filter_city != "All Cities":
-            filtered_reports = [r for r in filtered_reports if r["city"] == filter_city]
-
-        if filter_status != "All":
-            if filter_status == "Pending":
-                filtered_reports = [r for r in filtered_reports if not r.get("tag_bbmp", False) and not r.get("resolved", False)]
-            elif filter_status == "Tagged for BBMP":
-                filtered_reports = [r for r in filtered_reports if r.get("tag_bbmp", False)]
-            elif filter_status == "Resolved":
-                filtered_reports = [r for r in filtered_reports if r.get("resolved", False)]
-
-        # Apply sorting
-        if sort_by == "Newest First":
-            filtered_reports = sorted(filtered_reports, key=lambda x: x.get('created_at', datetime.now()), reverse=True)
-        elif sort_by == "Oldest First":
-            filtered_reports = sorted(filtered_reports, key=lambda x: x.get('created_at', datetime.now()))
-        elif sort_by == "Most Upvotes":
-            filtered_reports = sorted(filtered_reports, key=lambda x: x.get('upvotes', 0), reverse=True)
-        elif sort_by == "Severity (High to Low)":
-            filtered_reports = sorted(filtered_reports, key=lambda x: x.get('severity', 0), reverse=True)
-
-        # Show report count with better formatting
-        st.markdown(f"<h3 class='section-header'>📋 Showing {len(filtered_reports)} waste reports</h3>", unsafe_allow_html=True)
-
-        # Display reports with improved UI
-        for report in filtered_reports:
-            report_id = str(report['_id'])
-            
-            with st.container():
-                st.markdown(f'<div class="report-card">', unsafe_allow_html=True)
-                
-                # Report header
-                st.markdown(f'<div class="report-title">{report["title"]}</div>', unsafe_allow_html=True)
-                st.markdown(f'<div class="report-location">📍 {report["city"]} - {report["location"]}</div>', unsafe_allow_html=True)
-                
-                # Status tags
-                tags_html = '<div style="margin-bottom: 10px;">'
-                if report.get('tag_bbmp', False) and not report.get('resolved', False):
-                    tags_html += '<span class="tag bbmp-tag">BBMP Tagged</span>'
-                elif report.get('resolved', False):
-                    tags_html += '<span class="tag resolved-tag">Resolved</span>'
-                else:
-                    tags_html += '<span class="tag pending-tag">Pending</span>'
-                tags_html += '</div>'
-                st.markdown(tags_html, unsafe_allow_html=True)
-                
-                # Report metadata
-                severity = report.get('severity', 3)
-                severity_color = {
-                    1: "#c9e3c3",
-                    2: "#a5d28d",
-                    3: "#ffeb99", 
-                    4: "#ffa07a",
-                    5: "#ff6961"
-                }.get(severity, "#ffeb99")
-                
-                st.markdown(f"""
-                <div class="report-metadata">
-                    <span class="severity-indicator">
-                        Severity: 
-                        <span class="severity-dot" style="background-color: {severity_color};"></span>
-                        {severity}/5
-                    </span>
-                    <span>👍 {report.get('upvotes', 0)} Upvotes</span>
-                    <span>💬 {len(report.get('comments', []))} Comments</span>
-                    <span>📅 Reported: {report.get('created_at', datetime.now()).strftime('%Y-%m-%d')}</span>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Description
-                st.markdown(f"""
-                <div class="report-description">
-                    {report['description']}
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Display image if available
-                if 'image' in report and report['image']:
-                    try:
-                        image_data = base64.b64decode(report['image'])
-                        image = Image.open(BytesIO(image_data))
-                        st.image(image, width=300)
-                    except Exception as e:
-                        st.error(f"Error displaying image: {e}")
-                
-                # Upvote and Comment Actions
-                col1, col2 = st.columns([1, 3])
-                
-                with col1:
-                    upvote_btn = st.button(f"👍 Upvote ({report.get('upvotes', 0)})", key=f"upvote_{report_id}")
-                    if upvote_btn:
-                        success, message = upvote_report(report_id, st.session_state.user_id)
-                        if success:
-                            st.success(message)
-                            st.rerun()
-                        else:
-                            st.error(message)
-                
-                with col2:
-                    with st.expander("💬 Add a comment"):
-                        with st.form(key=f"comment_form_{report_id}"):
-                            comment_text = st.text_area("Your comment", key=f"comment_text_{report_id}")
-                            submit_comment = st.form_submit_button("Post Comment")
-                            if submit_comment and comment_text:
-                                success, message = add_comment(report_id, comment_text, st.session_state.user_id)
-                                if success:
-                                    st.success(message)
-                                    st.rerun()
-                                else:
-                                    st.error(message)
-                
-                # Display comments
-                if report.get('comments', []):
-                    with st.expander(f"View {len(report.get('comments', []))} Comments"):
-                        for comment in report.get('comments', []):
-                            st.markdown(f"""
-                            <div class="comment-box">
-                                <strong>Anonymous</strong> · {comment.get('timestamp', datetime.now()).strftime('%Y-%m-%d %H:%M')}
-                                <p>{comment.get('text', '')}</p>
-                            </div>
-                            """, unsafe_allow_html=True)
-                
-                st.markdown('</div>', unsafe_allow_html=True)
+        # Filter, sort and limit on the server
+        query = build_report_query(
+            city=None if filter_city == "All Cities" else filter_city,
+            status=None if filter_status == "All" else filter_status,
+        )
+        limit = report_limit_control("public_report_limit", (filter_city, filter_status, sort_by, search))
+        display_public_report_list(query, sort_by, search, limit)
                 
     except Exception as e:
         st.error(f"An error occurred: {e}")
@@ -830,7 +972,7 @@ def display_report_form():
                 st.error("Please fill in all required fields")
             else:
                 # Process image if uploaded
-                image_data = None
+                image_id = None
                 if image_file is not None:
                     try:
                         image = Image.open(image_file)
@@ -845,7 +987,10 @@ def display_report_form():
                         image.thumbnail((800, 800))
                         buffered = BytesIO()
                         image.save(buffered, format="JPEG")
-                        image_data = base64.b64encode(buffered.getvalue()).decode()
+                        store = get_media_store()
+                        if store is None:
+                            raise RuntimeError("database connection failed")
+                        image_id = store.save_image(buffered.getvalue())
                     except Exception as e:
                         st.error(f"Error processing image: {e}")
                 
@@ -856,7 +1001,7 @@ def display_report_form():
                     "location": location,
                     "description": description,
                     "severity": severity,
-                    "image": image_data
+                    "image_id": image_id
                 }
                 
                 success = record_waste_report(report_data, st.session_state.user_id)
@@ -883,8 +1028,7 @@ def display_registration_form():
         city_names = ["Select City"] + [city["name"] for city in cities_data]
         city = st.selectbox("City", city_names)
         
-        time_slots = ["Any Time", "Morning (8 AM - 12 PM)", "Afternoon (12 PM - 4 PM)", "Evening (4 PM - 8 PM)"]
-        time_slot = st.selectbox("Preferred Time", time_slots)
+        time_slot = st.selectbox("Preferred Time", REGISTRATION_TIME_SLOTS)
         
         st.markdown("""
         By registering, you agree to volunteer in waste management activities organized in your city.
@@ -923,6 +1067,10 @@ def display_cities():
             leader = sorted_cities[0]
             st.markdown(f"**Current leader: {leader['name']} with {leader['votes']} votes**")
         
+        # Check once whether the voting period ended
+        voting_end, _ = get_campaign_dates()
+        voting_ended = datetime.now() > voting_end
+        
         # Create three columns for city cards
         cols = st.columns(3)
         
@@ -955,16 +1103,12 @@ def display_cities():
                 button_text = "Voted" if is_voted else "Vote"
                 button_class = "vote-button voted" if is_voted else "vote-button"
                 
-                # Check if voting period ended
-                voting_end, _ = get_campaign_dates()
-                voting_ended = datetime.now() > voting_end
-                
                 if voting_ended:
                     st.info("Voting period has ended")
                 else:
                     if st.button(button_text, key=f"vote_{city['name']}", 
                                disabled=is_voted):
-                        success, message = record_vote(city["name"])
+                        success, message = record_vote(city["name"], st.session_state.user_id)
                         if success:
                             st.session_state.voted_city = city["name"]
                             st.success(message)
@@ -1070,8 +1214,7 @@ def run_waste_awareness_app():
         st.session_state.registered = False
         
     try:
-        initialize_admin_accounts()
-        initialize_cities_data()
+        bootstrap_once()
     except Exception as e:
         st.error(f"Error initializing database: {e}")
     
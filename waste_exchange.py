@@ -7,6 +7,13 @@ from database import (
     create_buyer_request,
     get_seller_listings,
     get_buyer_requests,
+    get_seller_listings_page,
+    get_buyer_requests_page,
+    search_seller_listings,
+    search_buyer_requests,
+    get_exchange_dashboard_stats,
+    get_listing_images,
+    get_media_store,
     update_listing_status,
     delete_listing
 )
@@ -16,6 +23,20 @@ from PIL import Image
 import webbrowser
 import re
 import urllib.parse
+from pymongo import ASCENDING, DESCENDING
+
+# UI sort options mapped to MongoDB sort specifications; _id breaks ties for keyset pagination
+LISTING_SORT_OPTIONS = {
+    "Newest First": [("created_at", DESCENDING), ("_id", DESCENDING)],
+    "Oldest First": [("created_at", ASCENDING), ("_id", ASCENDING)],
+    "Price: Low to High": [("price", ASCENDING), ("_id", ASCENDING)],
+    "Price: High to Low": [("price", DESCENDING), ("_id", DESCENDING)],
+}
+
+REQUEST_SORT_OPTIONS = {
+    "Newest First": [("created_at", DESCENDING), ("_id", DESCENDING)],
+    "Oldest First": [("created_at", ASCENDING), ("_id", ASCENDING)],
+}
 
 # Set page configuration for better appearance
 
@@ -116,10 +137,23 @@ def upload_and_save_image():
         
         buffered = BytesIO()
         image.save(buffered, format="JPEG", quality=85)
-        img_str = base64.b64encode(buffered.getvalue()).decode()
-        return img_str
+        return buffered.getvalue()
     return None
 
+def display_stored_image(image_id, key):
+    """Shows the stored thumbnail and loads the original image only when asked for."""
+    store = get_media_store()
+    thumbnail = store.get_thumbnail(image_id) if store else None
+    if thumbnail is None:
+        st.error("Error loading image")
+        return
+    
+    st.image(thumbnail, caption='Waste Image', use_container_width=True)
+    if st.toggle("View full image", key=key):
+        original = store.get_original(image_id)
+        if original:
+            st.image(original, use_container_width=True)
+
 def format_phone_number(phone_number):
     # Clean the phone number of non-numeric characters
     clean_number = re.sub(r'\D', '', phone_number)
@@ -181,6 +215,14 @@ def create_selling_listing():
             if not contact_number:
                 st.error("Please provide a contact number")
                 return
+            
+            image_id = None
+            if image_data:
+                store = get_media_store()
+                if store is None:
+                    st.error("Error saving image: database connection failed")
+                    return
+                image_id = store.save_image(image_data)
                 
             listing_data = {
                 "user": st.session_state.username,
@@ -191,7 +233,7 @@ def create_selling_listing():
                 "description": description,
                 "contact_number": contact_number,
                 "best_contact_time": best_contact_time,
-                "image": image_data,
+                "image_id": image_id,
                 "created_at": datetime.now(),
                 "status": "Active"
             }
@@ -256,7 +298,7 @@ def create_buying_request():
             else:
                 st.error(f"Error creating request: {message}")
 
-def display_seller_listing(item, show_delete=False):
+def display_seller_listing(item, show_delete=False, image=None):
     with st.container():
         
         st.markdown('<div class="listing-card">Waste Exchange System</div>', unsafe_allow_html=True)
@@ -300,9 +342,12 @@ def display_seller_listing(item, show_delete=False):
                         st.error(f"Error deleting listing: {message}")
         
         with col2:
-            if item.get('image'):
+            image = image or item.get('image')
+            if item.get('image_id'):
+                display_stored_image(item['image_id'], f"full_img_{item['_id']}")
+            elif image:
                 try:
-                    img_data = base64.b64decode(item['image'])
+                    img_data = base64.b64decode(image)
                     img = Image.open(BytesIO(img_data))
                     st.image(img, caption='Waste Image', use_container_width=True)
                 except Exception as e:
@@ -314,6 +359,12 @@ def display_seller_listing(item, show_delete=False):
     
     # Colored separator between listings
     st.markdown('<div class="listing-separator"></div>', unsafe_allow_html=True)
+
+def display_seller_listings(listings, show_delete=False):
+    """Displays listing summaries, loading inline images of legacy rows in one query."""
+    images = get_listing_images([item['_id'] for item in listings if not item.get('image_id')])
+    for item in listings:
+        display_seller_listing(item, show_delete=show_delete, image=images.get(item['_id']))
     
 def display_buyer_request(item, show_delete=False):
     with st.container():
@@ -364,9 +415,41 @@ def display_buyer_request(item, show_delete=False):
     # Colored separator between listings
     st.markdown('<div class="listing-separator"></div>', unsafe_allow_html=True)
         
+def get_page_cursor(state_key, signature):
+    """Returns the cursor of the page being viewed, restarting at page one when the filters change."""
+    if st.session_state.get(f"{state_key}_signature") != signature:
+        st.session_state[f"{state_key}_signature"] = signature
+        st.session_state[f"{state_key}_cursors"] = [None]
+    return st.session_state[f"{state_key}_cursors"][-1]
+
+def page_navigation(state_key, next_cursor):
+    """Displays previous/next buttons that move through the stack of page cursors."""
+    cursors = st.session_state[f"{state_key}_cursors"]
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    
+    with col1:
+        if st.button("⬅️ Previous", key=f"{state_key}_prev", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    
+    with col2:
+        st.markdown(f"<div style='text-align: center;'>Page {len(cursors)}</div>", unsafe_allow_html=True)
+    
+    with col3:
+        if st.button("Next ➡️", key=f"{state_key}_next", disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun()
+
 def view_seller_listings():
     st.header("♻️ Available Waste Listings")
     
+    search = st.text_input(
+        "🔎 Search listings",
+        placeholder="e.g. copper wire Whitefield",
+        key="seller_search"
+    ).strip()
+    
     col1, col2 = st.columns([3, 1])
     
     with col1:
@@ -380,35 +463,39 @@ def view_seller_listings():
     with col2:
         sort_by = st.selectbox(
             "Sort By",
-            ["Newest First", "Oldest First", "Price: Low to High", "Price: High to Low"]
+            list(LISTING_SORT_OPTIONS)
         )
     
     query = {"status": "Active"}
     if waste_type_filter != "All":
         query["waste_type"] = waste_type_filter
     
-    listings = get_seller_listings(query)
+    cursor = get_page_cursor("seller_page", (waste_type_filter, sort_by, search))
+    if search:
+        # Search results are ranked by relevance and paged by page number
+        page = cursor or 0
+        listings, has_more = search_seller_listings(search, query, page=page)
+        next_cursor = page + 1 if has_more else None
+    else:
+        listings, next_cursor = get_seller_listings_page(query, LISTING_SORT_OPTIONS[sort_by], after=cursor)
     
-    if not listings:
-        st.info("No selling listings available")
+    if not listings and cursor is None:
+        st.info(f"No selling listings match '{search}'" if search else "No selling listings available")
         return
     
-    # Sort listings
-    if sort_by == "Newest First":
-        listings = sorted(listings, key=lambda x: x['created_at'], reverse=True)
-    elif sort_by == "Oldest First":
-        listings = sorted(listings, key=lambda x: x['created_at'])
-    elif sort_by == "Price: Low to High":
-        listings = sorted(listings, key=lambda x: x.get('price', 0))
-    elif sort_by == "Price: High to Low":
-        listings = sorted(listings, key=lambda x: x.get('price', 0), reverse=True)
+    display_seller_listings(listings)
     
-    for item in listings:
-        display_seller_listing(item)
+    page_navigation("seller_page", next_cursor)
 
 def view_buyer_requests():
     st.header("🔍 Active Buying Requests")
     
+    search = st.text_input(
+        "🔎 Search requests",
+        placeholder="e.g. cardboard boxes Koramangala",
+        key="buyer_search"
+    ).strip()
+    
     col1, col2 = st.columns([3, 1])
     
     with col1:
@@ -423,7 +510,7 @@ def view_buyer_requests():
     with col2:
         sort_by = st.selectbox(
             "Sort By",
-            ["Newest First", "Oldest First"],
+            list(REQUEST_SORT_OPTIONS),
             key="buyer_sort"
         )
     
@@ -431,20 +518,23 @@ def view_buyer_requests():
     if waste_type_filter != "All":
         query["waste_type"] = waste_type_filter
     
-    requests = get_buyer_requests(query)
+    cursor = get_page_cursor("buyer_page", (waste_type_filter, sort_by, search))
+    if search:
+        # Search results are ranked by relevance and paged by page number
+        page = cursor or 0
+        requests, has_more = search_buyer_requests(search, query, page=page)
+        next_cursor = page + 1 if has_more else None
+    else:
+        requests, next_cursor = get_buyer_requests_page(query, REQUEST_SORT_OPTIONS[sort_by], after=cursor)
     
-    if not requests:
-        st.info("No buying requests available")
+    if not requests and cursor is None:
+        st.info(f"No buying requests match '{search}'" if search else "No buying requests available")
         return
     
-    # Sort requests
-    if sort_by == "Newest First":
-        requests = sorted(requests, key=lambda x: x['created_at'], reverse=True)
-    elif sort_by == "Oldest First":
-        requests = sorted(requests, key=lambda x: x['created_at'])
-    
     for item in requests:
         display_buyer_request(item)
+    
+    page_navigation("buyer_page", next_cursor)
         
 def my_listings():
     st.header("My Listings")
@@ -460,8 +550,7 @@ def my_listings():
         if not sell_listings:
             st.info("You haven't created any selling listings yet")
         else:
-            for item in sell_listings:
-                display_seller_listing(item, show_delete=True)
+            display_seller_listings(sell_listings, show_delete=True)
     
     with tab2:
         buy_requests = get_buyer_requests({
@@ -481,51 +570,35 @@ def dashboard():
     col1, col2, col3 = st.columns(3)
     
     # Get stats
-    seller_listings = get_seller_listings({"status": "Active"})
-    buyer_requests = get_buyer_requests({"status": "Active"})
+    stats = get_exchange_dashboard_stats(st.session_state.username)
     
     with col1:
-        st.metric("Active Waste Listings", len(seller_listings))
+        st.metric("Active Waste Listings", stats["active_listings"])
     
     with col2:
-        st.metric("Active Buying Requests", len(buyer_requests))
+        st.metric("Active Buying Requests", stats["active_requests"])
     
     with col3:
-        my_listings_count = len(get_seller_listings({"user": st.session_state.username, "status": "Active"}))
-        my_requests_count = len(get_buyer_requests({"user": st.session_state.username, "status": "Active"}))
-        st.metric("My Active Posts", my_listings_count + my_requests_count)
-    
-    # Most common waste types
-    waste_types = {}
-    for item in seller_listings:
-        waste_type = item.get('waste_type')
-        if waste_type in waste_types:
-            waste_types[waste_type] += 1
-        else:
-            waste_types[waste_type] = 1
+        st.metric("My Active Posts", stats["my_active_posts"])
     
     # Display waste types distribution if any exist
-    if waste_types:
+    if stats["waste_types"]:
         st.subheader("Popular Waste Categories")
         
-        # Sort waste types by count
-        sorted_waste_types = sorted(waste_types.items(), key=lambda x: x[1], reverse=True)
-        
-        # Create a horizontal bar chart
+        # Create a horizontal bar chart (already sorted by count)
         chart_data = {
-            "Category": [item[0] for item in sorted_waste_types],
-            "Count": [item[1] for item in sorted_waste_types]
+            "Category": [item[0] for item in stats["waste_types"]],
+            "Count": [item[1] for item in stats["waste_types"]]
         }
         
         st.bar_chart(chart_data, x="Category", y="Count")
     
     # Recent listings
     st.subheader("Recent Listings")
-    recent_listings = sorted(seller_listings, key=lambda x: x['created_at'], reverse=True)[:3]
+    recent_listings = stats["recent_listings"]
     
     if recent_listings:
-        for item in recent_listings:
-            display_seller_listing(item)
+        display_seller_listings(recent_listings)
     else:
         st.info("No recent listings available")
         